@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import select
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from pathlib import Path
+
+import linuxpad as lp
+
+FAKE_BACKEND = r'''
+import os, signal, socket, sys, time, wave
+tool = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+sock.setblocking(False)
+
+def event(kind, target, *extra):
+    try:
+        sock.sendto(" ".join(map(str, (kind, time.monotonic_ns(), target) + extra)).encode(), os.environ["LINUXPAD_FAKE_SINK"])
+    except OSError:
+        pass
+
+if tool == "pactl":
+    if args[:1] == ["subscribe"]:
+        signal.pause()
+    elif args[:2] == ["list", "sinks"]:
+        print("0\tlinuxpad_bench\tPipeWire\ts16le 2ch 48000Hz\tIDLE")
+elif tool == "ffmpeg":
+    with wave.open(args[args.index("-i") + 1]) as w:
+        sys.stdout.buffer.write(w.readframes(w.getnframes()))
+elif tool == "pw-play":
+    target = args[args.index("--target") + 1] if "--target" in args else "default"
+    if args[-1] != "-":
+        def done(*_):
+            event("offset", target)
+            os._exit(0)
+        signal.signal(signal.SIGINT, done)
+        signal.signal(signal.SIGTERM, done)
+        event("onset", target)
+        time.sleep(5)
+        done()
+    from array import array
+    src, t0, n, loud, level = sys.stdin.buffer, time.monotonic(), 0, False, 0
+    while True:
+        block = src.read(1920)
+        if not block:
+            break
+        if bool(bytes(block).strip(b"\0")) != loud:
+            loud = not loud
+            event("onset" if loud else "offset", target)
+        pcm = array("h", block[:len(block) // 4 * 4])
+        for i in range(0, len(pcm), 2):
+            if round(pcm[i] / 500) != level:
+                level = round(pcm[i] / 500)
+                event("level", target, n // 4 + i // 2, level)
+        n += len(block)
+        time.sleep(max(0.0, t0 + n / 192000 - time.monotonic()))
+'''
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50": round(pick(0.50), 3), "p95": round(pick(0.95), 3), "p99": round(pick(0.99), 3),
+            "max": round(values[-1], 3), "n": len(values)}
+
+
+def bench_hotkeys(n=100000, bound=1000):
+    if not lp.load_pynput():
+        return {"error": "pynput is not installed"}
+    ghk = lp.GlobalHotkeyListener(lambda fp: None)
+    ghk.set_hotkeys([(f"Ctrl+Alt+F{i % 24 + 1}", f"/bench/{i}.wav") for i in range(bound)] + [("Num5", "/bench/kp5.wav")])
+    ctrl = lp.keyboard.Key.ctrl_l
+    miss = lp.keyboard.KeyCode.from_char("x")
+    hit = lp.keyboard.KeyCode(vk=0xffb5, char="5")
+    result = {"bound_hotkeys": len(ghk.hotkeys), "events": n}
+    for name, key, mods in (("miss_ns", miss, ()), ("hit_ns", hit, ()), ("chord_miss_ns", miss, (ctrl,))):
+        for m in mods:
+            ghk.on_press(m)
+        t = time.perf_counter_ns()
+        for _ in range(n):
+            ghk.on_press(key)
+            ghk.on_release(key)
+        result[name] = (time.perf_counter_ns() - t) / n
+        for m in mods:
+            ghk.on_release(m)
+    return result
+
+
+class FakeBackend:
+    TARGET = "linuxpad_bench"
+
+    def __init__(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="linuxpad-bench-"))
+        self.saved = lp.CONFIG_FILE, lp.CACHE_DIR, lp.SOCKET_PATH
+        lp.CONFIG_FILE, lp.CACHE_DIR, lp.SOCKET_PATH = self.tmp / "config.json", self.tmp / "cache", self.tmp / "linuxpad.sock"
+        bindir = self.tmp / "bin"
+        bindir.mkdir()
+        script = bindir / "fake_backend.py"
+        script.write_text(FAKE_BACKEND)
+        tools = ["pw-play", "pactl"] + ([] if shutil.which("ffmpeg") else ["ffmpeg"])
+        for tool in tools:
+            shim = bindir / tool
+            shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" -S -E -c "import sys; sys.argv[0] = \'{tool}\'; '
+                            f'exec(open(\'{script}\').read())" "$@"\n')
+            shim.chmod(0o755)
+        self.old_path = os.environ.get("PATH", "")
+        os.environ["PATH"] = f"{bindir}{os.pathsep}{self.old_path}"
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(str(self.tmp / "sink.sock"))
+        os.environ["LINUXPAD_FAKE_SINK"] = str(self.tmp / "sink.sock")
+
+    def clip(self, name, seconds=1.0, level=None, marker=None):
+        fp = self.tmp / f"{name}.wav"
+        frames = int(lp.RATE * seconds)
+        if level is None:
+            tone = array("h", [int(12000 * math.sin(2 * math.pi * 440 * (i // lp.CHANNELS) / lp.RATE)) + 1
+                               for i in range(frames * lp.CHANNELS)])
+        else:
+            head = 48 if marker is not None else 0
+            tone = array("h", [marker or 0] * (head * lp.CHANNELS) + [level] * ((frames - head) * lp.CHANNELS))
+        with wave.open(str(fp), "wb") as w:
+            w.setnchannels(lp.CHANNELS)
+            w.setsampwidth(2)
+            w.setframerate(lp.RATE)
+            w.writeframes(tone.tobytes())
+        return str(fp)
+
+    def drain(self):
+        self.sock.setblocking(False)
+        try:
+            while True:
+                self.sock.recv(256)
+        except BlockingIOError:
+            pass
+
+    def wait(self, kind, app=None, timeout=2.0, target=None):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if app:
+                app.processEvents()
+            ready, _, _ = select.select([self.sock], [], [], 0.002)
+            if not ready:
+                continue
+            ev, ns, sink = self.sock.recv(256).decode().split(" ")[:3]
+            if ev == kind and sink == (target or self.TARGET):
+                return int(ns)
+        return None
+
+    def events(self, seconds, kinds=("onset", "offset")):
+        events = []
+        deadline = time.monotonic() + seconds
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([self.sock], [], [], left)[0]:
+                return events
+            ev, ns, target, *extra = self.sock.recv(256).decode().split(" ")
+            if ev in kinds:
+                events.append((ev, int(ns), target, *map(int, extra)))
+
+    def levels(self, seconds):
+        return [(ns, frame, level) for _, ns, target, frame, level in self.events(seconds, ("level",))
+                if target == self.TARGET]
+
+    def close(self):
+        os.environ["PATH"] = self.old_path
+        lp.CONFIG_FILE, lp.CACHE_DIR, lp.SOCKET_PATH = self.saved
+        self.sock.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def decoded(engine, paths):
+    samples = [engine.cache.get(fp) for fp in paths]
+    while not all(s.done for s in samples):
+        time.sleep(0.01)
+
+
+class WriteProbe:
+    def __init__(self, out):
+        self.events = []
+        self.cond = threading.Condition()
+        out.on_write = self.written
+
+    def written(self, block):
+        with self.cond:
+            self.events.append((time.monotonic_ns(), bool(bytes(block).strip(b"\0"))))
+            self.cond.notify_all()
+
+    def wait(self, loud, since, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                ns = next((ns for ns, lv in self.events if ns >= since and lv == loud), None)
+                left = deadline - time.monotonic()
+                if ns is not None or left <= 0:
+                    return ns
+                self.cond.wait(left)
+
+    def settle(self):
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            with self.cond:
+                if self.events and not self.events[-1][1]:
+                    return True
+                self.cond.wait(0.05)
+        return False
+
+
+def bench_trigger(iterations=50, retriggers=200):
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([sys.argv[0], "-platform", "offscreen"])
+    fake = FakeBackend()
+    results = {}
+    try:
+        clips = [fake.clip(f"clip{i}") for i in range(4)]
+        keys = ["F1", "F2", "F3", "F4"]
+        for mode in ("engine", "process"):
+            lp.CONFIG_FILE.write_text(json.dumps({
+                "outputs": [{"name": "Mic", "target": fake.TARGET, "gain": 100, "enabled": True}],
+                "playback_mode": mode, "disk_cache": False, "audio_worker": False,
+                "sounds": [{"file": fp, "name": Path(fp).stem, "hotkey": hk} for fp, hk in zip(clips, keys)]}))
+            w = lp.SoundpadWindow()
+            w.finish_startup()
+            if mode == "engine" and not w.engine:
+                results[mode] = {"error": "engine unavailable"}
+                w.close()
+                continue
+            codes = [w.ghk.parse(k)[1] for k in keys]
+            if mode == "engine":
+                decoded(w.engine, clips)
+                probe = WriteProbe(w.engine.outputs["Mic"])
+
+                def onset(t0):
+                    return probe.wait(True, t0)
+
+                def offset(t0):
+                    return probe.wait(False, t0)
+            else:
+                def onset(t0):
+                    return fake.wait("onset", app)
+
+                def offset(t0):
+                    return fake.wait("offset", app)
+
+            def tap(code):
+                w.ghk.on_press(code)
+                w.ghk.on_release(code)
+
+            time.sleep(0.3)
+            trig, stop, stop_call = [], [], []
+            for _ in range(iterations):
+                if mode == "engine":
+                    probe.settle()
+                fake.drain()
+                t0 = time.monotonic_ns()
+                tap(codes[0])
+                ns = onset(t0)
+                if ns is None:
+                    continue
+                trig.append((ns - t0) / 1e6)
+                t1 = time.monotonic_ns()
+                w.stop_sound()
+                stop_call.append((time.monotonic_ns() - t1) / 1e6)
+                ns = offset(t1)
+                if ns is not None:
+                    stop.append((ns - t1) / 1e6)
+            n = retriggers if mode == "engine" else max(1, retriggers // 10)
+            calls = []
+            for i in range(n):
+                t = time.perf_counter_ns()
+                tap(codes[i % len(codes)])
+                app.processEvents()
+                calls.append((time.perf_counter_ns() - t) / 1e6)
+            w.stop_sound()
+            retrigger = percentiles(calls)
+            results[mode] = {"measured_at": "mixer write" if mode == "engine" else "pw-play start",
+                             "trigger_ms": percentiles(trig), "stop_ms": percentiles(stop),
+                             "stop_call_ms": percentiles(stop_call), "retrigger_ms": retrigger,
+                             "retrigger_per_s": round(1000 / max(retrigger["p50"], 0.001), 1),
+                             "missed": iterations - len(trig)}
+            w.close()
+            app.processEvents()
+    finally:
+        fake.close()
+    return results
+
+
+def bench_schedule(iterations=20):
+    fake = FakeBackend()
+    engine = None
+    try:
+        lp.load_numpy()
+        a, b = fake.clip("seq_a", 0.25, 1000), fake.clip("seq_b", 0.25, 2000)
+        loop = fake.clip("loop", 0.1, 3000, marker=6000)
+        hit = fake.clip("hit", 0.03, 1000)
+        engine = lp.PlaybackEngine(disk_cache=False, stream_seconds=0)
+        out = engine.set_output("bench", fake.TARGET)
+        decoded(engine, (a, b, loop, hit))
+        time.sleep(0.3)
+        results = {"period_frames": lp.PERIOD_FRAMES}
+
+        def boundary(events):
+            a_end = next((f for _, f, lv in events if lv != 2), None)
+            b_start = next((f for _, f, lv in events if lv == 4), None)
+            return None if a_end is None or b_start is None else b_start - a_end
+
+        for name in ("sequence", "retrigger"):
+            gaps = []
+            for _ in range(iterations):
+                fake.drain()
+                if name == "sequence":
+                    engine.sequence([a, b])
+                else:
+                    pb = engine.play(a)
+                    while not pb.finished():
+                        time.sleep(0.0005)
+                    engine.play(b)
+                events = fake.levels(0.7)
+                start = next((i for i, (_, _, lv) in enumerate(events) if lv == 2), None)
+                gap = None if start is None else boundary(events[start:])
+                if gap is not None:
+                    gaps.append(gap)
+            results[f"{name}_gap_frames"] = percentiles(gaps)
+
+        fake.drain()
+        engine.play(loop, loop=True)
+        events = fake.levels(1.5)
+        engine.stop()
+        marks = [f for _, f, lv in events if lv == 12]
+        seams = [f2 - f1 - int(0.1 * lp.RATE) for f1, f2 in zip(marks, marks[1:])]
+        results["loop"] = {"seams": len(seams), "seam_error_frames": percentiles([abs(s) for s in seams]),
+                           "dropouts": sum(1 for _, f, lv in events if lv == 0 and marks and f < marks[-1])}
+        time.sleep(0.2)
+
+        def trigger():
+            for i in range(iterations):
+                calls.append(time.monotonic_ns())
+                engine.play(hit)
+                time.sleep(0.06 + (i * 37 % 100) / 1000)
+
+        engine.set_quantize(120, 4)
+        fake.drain()
+        calls, errors, delays = [], [], []
+        player = threading.Thread(target=trigger)
+        player.start()
+        events = fake.levels(iterations * 0.11 + 0.5)
+        player.join()
+        onsets = [(ns, f) for (_, _, prev), (ns, f, lv) in zip([(0, 0, 0)] + events, events) if lv and not prev]
+        origin = out.grid[1]
+        for ns, f in onsets:
+            r = (f - origin) % engine.step
+            errors.append(min(r, engine.step - r))
+        for t in calls:
+            ns = next((ns for ns, _ in onsets if ns >= t), None)
+            if ns is not None:
+                delays.append((ns - t) / 1e6)
+        results["quantize"] = {"grid_frames": engine.step, "onsets": len(onsets),
+                               "grid_error_frames": percentiles(errors), "trigger_delay_ms": percentiles(delays)}
+        engine.set_quantize(0)
+
+        def ahead():
+            for i in range(iterations):
+                time.sleep(max(0.0, t0 + i * 0.1 - 0.05 - time.monotonic()))
+                engine.play(hit, at=t0 + i * 0.1)
+
+        fake.drain()
+        t0 = time.monotonic() + 0.1
+        player = threading.Thread(target=ahead)
+        player.start()
+        events = fake.levels(iterations * 0.1 + 0.5)
+        player.join()
+        onsets = [f for (_, _, prev), (_, f, lv) in zip([(0, 0, 0)] + events, events) if lv and not prev]
+        results["at"] = {"onsets": len(onsets), "spacing_error_frames": percentiles(
+            [abs(f2 - f1 - int(0.1 * lp.RATE)) for f1, f2 in zip(onsets, onsets[1:])])}
+        return results
+    finally:
+        if engine:
+            engine.shutdown()
+        fake.close()
+
+
+def bench_warm(iterations=10):
+    fake = FakeBackend()
+    engine = None
+    other = fake.TARGET + "_alt"
+    try:
+        lp.load_numpy()
+        clip, long_clip = fake.clip("warm", 0.2), fake.clip("warm_long", 1.0)
+        results = {k: [] for k in ("startup_ms", "warm_ms", "switch_ms", "switch_target_ms", "crossfade_overlap_ms",
+                                   "restart_gap_ms", "reconnect_ms", "reconnect_play_ms")}
+
+        def onset(t0, target=None):
+            ns = fake.wait("onset", timeout=2.0, target=target)
+            return None if ns is None else (ns - t0) / 1e6
+
+        def record(name, value):
+            if value is not None:
+                results[name].append(value)
+
+        for _ in range(iterations):
+            engine = lp.PlaybackEngine(disk_cache=False, stream_seconds=0)
+            decoded(engine, (clip, long_clip))
+            fake.drain()
+            t0 = time.monotonic_ns()
+            engine.set_output("bench", fake.TARGET)
+            engine.play(clip)
+            record("startup_ms", onset(t0))
+            time.sleep(0.4)
+            fake.drain()
+            t0 = time.monotonic_ns()
+            engine.play(clip)
+            record("warm_ms", onset(t0))
+            time.sleep(0.4)
+
+            fake.drain()
+            t0 = time.monotonic_ns()
+            engine.set_output("bench", other)
+            engine.play(clip)
+            events = fake.events(0.5)
+            record("switch_ms", next(((ns - t0) / 1e6 for ev, ns, _ in events if ev == "onset"), None))
+            record("switch_target_ms", next(((ns - t0) / 1e6 for ev, ns, t in events if ev == "onset" and t == other), None))
+            while engine.switching:
+                time.sleep(0.01)
+
+            engine.play(long_clip)
+            time.sleep(0.2)
+            fake.drain()
+            engine.set_output("bench", fake.TARGET)
+            events = fake.events(0.4)
+            off = next((ns for ev, ns, t in events if ev == "offset" and t == other), None)
+            on = next((ns for ev, ns, t in events if ev == "onset" and t == fake.TARGET), None)
+            if off and on:
+                record("crossfade_overlap_ms", (off - on) / 1e6)
+            time.sleep(0.5)
+
+            engine.play(long_clip)
+            time.sleep(0.2)
+            fake.drain()
+            out = engine.outputs["bench"]
+            t0 = time.monotonic_ns()
+            out.target = other
+            out.start()
+            record("restart_gap_ms", onset(t0, other))
+            engine.stop()
+            engine.set_output("bench", fake.TARGET)
+            time.sleep(0.3)
+
+            engine.set_devices([fake.TARGET])
+            engine.set_devices([])
+            fake.drain()
+            t0 = time.monotonic_ns()
+            engine.set_devices([fake.TARGET])
+            engine.play(clip)
+            record("reconnect_play_ms", onset(t0))
+            out = engine.outputs["bench"]
+            if out.flowed:
+                results["reconnect_ms"].append((out.flowed - t0 / 1e9) * 1e3)
+            engine.shutdown()
+            engine = None
+        return {k: percentiles(v) for k, v in results.items()}
+    finally:
+        if engine:
+            engine.shutdown()
+        fake.close()
+
+
+BENCHES = {"hotkeys": bench_hotkeys, "trigger": bench_trigger, "schedule": bench_schedule, "warm": bench_warm}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench.py", description="Benchmark linuxpad against a fake PipeWire backend")
+    parser.add_argument("bench", choices=BENCHES, help="benchmark to run")
+    parser.add_argument("--output", metavar="FILE", help="also write the JSON results to FILE")
+    args = parser.parse_args()
+    result = BENCHES[args.bench]()
+    text = json.dumps({"bench": args.bench, "time": time.time(), "results": result}, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,63 @@
 #!/usr/bin/env python3
+import time
+START_TIME = time.perf_counter()
 import sys
 import os
 import json
-import subprocess
+import argparse
+import socket
+import threading
+from pathlib import Path
+from linuxpad_ctl import SOCKET_PATH, ControlClient, ctl_main
+
+CONFIG_DIR = Path.home() / ".config" / "linuxpad"
+CONFIG_FILE = CONFIG_DIR / "config.json"
+CACHE_DIR = Path.home() / ".cache" / "linuxpad"
+
+if __name__ == "__main__":
+    if Path(sys.argv[0]).name == "linuxpad-ctl":
+        sys.exit(ctl_main(sys.argv[1:]))
+    if sys.argv[1:2] == ["--ctl"]:
+        sys.exit(ctl_main(sys.argv[2:]))
+
+import bisect
+import math
+import struct
 import signal
 import re
-from pathlib import Path
+import shutil
+import warnings
+from collections import OrderedDict, defaultdict, deque
+from types import MappingProxyType
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QMenu, QInputDialog, QTableWidget, QTableWidgetItem,
+    QLabel, QMenu, QInputDialog, QTableView,
     QHeaderView, QAbstractItemView, QFrame, QSplitter, QListWidget, 
     QListWidgetItem, QSlider, QPushButton, QFileDialog, QStyle, QToolBar,
-    QSizePolicy, QComboBox, QDialog, QDialogButtonBox, QListView, QLineEdit
+    QSizePolicy, QComboBox, QDialog, QDialogButtonBox, QListView, QLineEdit, QProgressBar, QMessageBox,
+    QStyledItemDelegate, QCheckBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QObject, QSize
-from PyQt6.QtGui import QShortcut, QKeySequence, QAction, QFont, QColor, QBrush
+from PyQt6.QtCore import Qt, pyqtSignal, QObject, QSize, QTimer, QAbstractTableModel, QModelIndex, QLineF
+from PyQt6.QtGui import QShortcut, QKeySequence, QAction, QFont, QColor, QBrush, QPen, QPixmap, QPainter
 
-CONFIG_DIR = Path.home() / ".config" / "linuxpad"
-CONFIG_FILE = CONFIG_DIR / "config.json"
+AUDIO_EXTS = {".mp3", ".wav", ".ogg", ".flac", ".m4a", ".opus", ".aac"}
+
+RATE = 48000
+CHANNELS = 2
+FRAME_BYTES = CHANNELS * 2
+PERIOD_FRAMES = 480
+PIPE_BYTES = 4096
+SOFT_KNEE = 0.8
+K_WEIGHTING = (((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585)),
+               ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)))
+TRUE_PEAK_CEILING = -1.0
+MAX_BOOST_DB = 12.0
+STREAM_BUFFER_SECONDS = 4
+STREAM_BYTES_PER_SECOND = 32000
+MAX_MAPPED_SAMPLES = 512
+STATS_FILES = {"jsonl": "stats.jsonl", "prometheus": "linuxpad.prom"}
+CROSSFADE_SECONDS = 0.05
+PEAK_BINS = 96
 
 DARK_THEME = """
 QMainWindow { background-color: #1e1e1e; color: #ffffff; }
@@ -25,7 +65,7 @@ QWidget { background-color: #1e1e1e; color: #ffffff; font-family: "Segoe UI", sa
 QToolBar { background-color: #2d2d2d; border-bottom: 1px solid #3d3d3d; spacing: 10px; padding: 5px; }
 QToolButton { background-color: transparent; border: 1px solid transparent; border-radius: 3px; padding: 4px; }
 QToolButton:hover { background-color: #3d3d3d; border: 1px solid #5294e2; }
-QTableWidget {
+QTableView {
     background-color: #1e1e1e; gridline-color: #2d2d2d; border: none;
     selection-background-color: #3daee9; selection-color: #ffffff; alternate-background-color: #252525;
 }
@@ -33,7 +73,7 @@ QHeaderView::section {
     background-color: #2d2d2d; color: #cccccc; border: none;
     border-right: 1px solid #3d3d3d; border-bottom: 1px solid #3d3d3d; padding: 4px;
 }
-QTableWidget::item { padding: 5px; }
+QTableView::item { padding: 5px; }
 QListWidget { background-color: #252525; border-right: 1px solid #3d3d3d; outline: none; }
 QListWidget::item { padding: 10px; color: #cccccc; }
 QListWidget::item:selected { background-color: #3daee9; color: white; }
@@ -42,6 +82,7 @@ QSlider::handle:horizontal { background: #3daee9; width: 14px; margin: -5px 0; b
 QSlider::sub-page:horizontal { background: #3daee9; border-radius: 2px; }
 QFrame#StatusBar { background-color: #2d2d2d; border-top: 1px solid #3d3d3d; }
 QLabel#StatusLabel { color: #888888; padding: 0 10px; }
+QLabel#StatsPanel { background-color: #252525; color: #aaaaaa; border-top: 1px solid #3d3d3d; padding: 4px 10px; font-family: monospace; font-size: 12px; }
 QComboBox {
     background-color: #252525; border: 1px solid #3d3d3d; border-radius: 4px; padding: 4px 8px; min-width: 200px;
 }
@@ -54,71 +95,181 @@ QLineEdit { background-color: #252525; border: 1px solid #3d3d3d; border-radius:
 QLineEdit:focus { border: 1px solid #5294e2; }
 """
 
+keyboard = None
+MODIFIER_KEYS = {}
+np = None
+STARTUP_PHASES = [("interpreter", START_TIME)]
+
+
+def startup_mark(phase):
+    STARTUP_PHASES.append((phase, time.perf_counter()))
+
+
+def startup_report():
+    prev = STARTUP_PHASES[0][1]
+    lines = []
+    for phase, t in STARTUP_PHASES[1:]:
+        lines.append(f"  {phase:<16}{(t - prev) * 1000:8.1f} ms")
+        prev = t
+    total = (prev - STARTUP_PHASES[0][1]) * 1000
+    return "startup profile:\n" + "\n".join(lines) + f"\n  {'total':<16}{total:8.1f} ms"
+
+
+def load_pynput():
+    global keyboard, MODIFIER_KEYS
+    if keyboard is None:
+        try:
+            from pynput import keyboard as kb
+        except ImportError:
+            keyboard = False
+            return False
+        MODIFIER_KEYS = {k: bit for bit, names in ((MOD_CTRL, ("ctrl", "ctrl_l", "ctrl_r")),
+                                                    (MOD_ALT, ("alt", "alt_l", "alt_r", "alt_gr")),
+                                                    (MOD_SHIFT, ("shift", "shift_l", "shift_r")),
+                                                    (MOD_SUPER, ("cmd", "cmd_l", "cmd_r")))
+                         for k in (getattr(kb.Key, n, None) for n in names) if k is not None}
+        keyboard = kb
+    return bool(keyboard)
+
+
+def load_numpy():
+    global np
+    try:
+        import numpy
+    except ImportError:
+        return False
+    np = numpy
+    return True
+
 try:
-    from pynput import keyboard
-    HAS_PYNPUT = True
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
 except ImportError:
-    HAS_PYNPUT = False
+    audioop = None
 
 class HotkeySignal(QObject):
     triggered = pyqtSignal(str)
+    status = pyqtSignal(str)
+
+MOD_CTRL, MOD_ALT, MOD_SHIFT, MOD_SUPER = 1, 2, 4, 8
+MODIFIER_NAMES = {"ctrl": MOD_CTRL, "control": MOD_CTRL, "alt": MOD_ALT, "shift": MOD_SHIFT,
+                  "super": MOD_SUPER, "win": MOD_SUPER, "meta": MOD_SUPER, "cmd": MOD_SUPER}
+NAMED_KEYS = {"space": "space", "enter": "enter", "return": "enter", "tab": "tab", "esc": "esc", "escape": "esc",
+              "backspace": "backspace", "insert": "insert", "ins": "insert", "delete": "delete", "del": "delete",
+              "home": "home", "end": "end", "pageup": "page_up", "pgup": "page_up", "pagedown": "page_down",
+              "pgdn": "page_down", "up": "up", "down": "down", "left": "left", "right": "right",
+              "pause": "pause", "printscreen": "print_screen", "menu": "menu"}
+NUMPAD_NAMES = {str(i) for i in range(10)} | {"+", "-", "*", "/", ".", "enter"}
+NUMPAD_VK = {**{0xffb0 + i: f"kp{i}" for i in range(10)},
+             0xffab: "kp+", 0xffad: "kp-", 0xffaa: "kp*", 0xffaf: "kp/", 0xffae: "kp.", 0xff8d: "kpenter",
+             0xff9e: "kp0", 0xff9c: "kp1", 0xff99: "kp2", 0xff9b: "kp3", 0xff96: "kp4",
+             0xff9d: "kp5", 0xff98: "kp6", 0xff95: "kp7", 0xff97: "kp8", 0xff9a: "kp9", 0xff9f: "kp."}
+NUMPAD_CHARS = {f"kp{c}": c for c in "0123456789+-*/."}
 
 class GlobalHotkeyListener:
     def __init__(self, callback):
         self.callback = callback
-        self.hotkeys = {}
+        self.hotkeys = MappingProxyType({})
         self.listener = None
-        self.pressed_keys = {}
+        self.held = set()
+        self.held_mods = {}
+        self.mods = 0
         self.active = True
-    
-    def parse(self, h_str):
-        h_str = h_str.lower().strip()
-        if h_str.startswith("f") and h_str[1:].isdigit():
-            return getattr(keyboard.Key, h_str, None)
-        elif len(h_str) == 1:
-            return h_str
+
+    @staticmethod
+    def key_name(name):
+        if name.startswith("f") and name[1:].isdigit():
+            return getattr(keyboard.Key, name, None) if load_pynput() else name
+        for prefix in ("num", "kp_", "kp"):
+            if name.startswith(prefix) and name[len(prefix):] in NUMPAD_NAMES:
+                return "kp" + name[len(prefix):]
+        if name in NAMED_KEYS:
+            return getattr(keyboard.Key, NAMED_KEYS[name], None) if load_pynput() else NAMED_KEYS[name]
+        if len(name) == 1:
+            return name
         return None
 
-    def register(self, h_str, f_path):
-        try:
-            key = self.parse(h_str)
-            if key:
-                self.hotkeys[key] = f_path
-        except: 
-            pass
+    def parse(self, h_str):
+        h = h_str.lower().replace(" ", "")
+        if not h:
+            return None
+        parts = h.split("+")
+        if h.endswith("+"):
+            parts = parts[:-2] + [parts[-2] + "+"]
+        *mods, name = parts
+        bits = 0
+        for m in mods:
+            if m not in MODIFIER_NAMES:
+                return None
+            bits |= MODIFIER_NAMES[m]
+        key = self.key_name(name)
+        if key is None or bits & MOD_SHIFT and self.shifted(key):
+            return None
+        return bits, key
+
+    @staticmethod
+    def shifted(kid):
+        return type(kid) is str and len(kid) == 1 and not kid.isalpha()
+
+    def set_hotkeys(self, pairs):
+        table = {}
+        for h_str, f_path in pairs:
+            chord = self.parse(h_str)
+            if chord:
+                table[chord] = f_path
+        self.hotkeys = MappingProxyType(table)
 
-    def clear(self): 
-        self.hotkeys.clear()
+    def key_id(self, key):
+        vk = getattr(key, "vk", None)
+        if vk in NUMPAD_VK:
+            return NUMPAD_VK[vk]
+        char = getattr(key, "char", None)
+        if char is None:
+            return key
+        if char < " ":
+            char = chr(ord(char) + 96)
+        return char.lower()
 
     def on_press(self, key):
+        bit = MODIFIER_KEYS.get(key)
+        if bit:
+            self.held_mods[key] = bit
+            self.mods |= bit
+            return
         if not self.active:
             return
-        try:
-            if hasattr(key, 'char') and key.char:
-                check_key = key.char.lower()
-            else:
-                check_key = key
-            key_id = str(check_key)
-            if key_id not in self.pressed_keys:
-                self.pressed_keys[key_id] = True
-                if check_key in self.hotkeys:
-                    self.callback(self.hotkeys[check_key])
-        except:
-            pass
+        kid = self.key_id(key)
+        if kid in self.held:
+            return
+        self.held.add(kid)
+        mods = self.mods & ~MOD_SHIFT if self.shifted(kid) else self.mods
+        f_path = self.hotkeys.get((mods, kid))
+        if f_path is None and kid in NUMPAD_CHARS:
+            char = NUMPAD_CHARS[kid]
+            f_path = self.hotkeys.get((self.mods & ~MOD_SHIFT if self.shifted(char) else self.mods, char))
+        if f_path is not None:
+            try:
+                self.callback(f_path)
+            except Exception as e:
+                print(f"linuxpad: hotkey action failed: {e}", file=sys.stderr)
 
     def on_release(self, key):
-        try:
-            if hasattr(key, 'char') and key.char:
-                check_key = key.char.lower()
-            else:
-                check_key = key
-            key_id = str(check_key)
-            self.pressed_keys.pop(key_id, None)
-        except:
-            pass
+        if key in self.held_mods:
+            del self.held_mods[key]
+            mods = 0
+            for bit in self.held_mods.values():
+                mods |= bit
+            self.mods = mods
+            return
+        kid = self.key_id(key)
+        if kid in self.held:
+            self.held.discard(kid)
+        else:
+            self.held.difference_update([k for k in self.held if self.shifted(k)])
 
     def start(self):
-        if HAS_PYNPUT and not self.listener:
+        if not self.listener and load_pynput():
             self.active = True
             self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release, suppress=False)
             self.listener.start()
@@ -128,48 +279,72 @@ class GlobalHotkeyListener:
         if self.listener:
             self.listener.stop()
             self.listener = None
-        self.pressed_keys.clear()
+        self.held.clear()
+        self.held_mods.clear()
+        self.mods = 0
 
 
 class AudioDeviceManager:
     @staticmethod
     def get_all_targets():
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            kinds = ["sink", "source", "node"]
+            results = dict(zip(kinds, pool.map(AudioDeviceManager.query, kinds)))
+        return AudioDeviceManager.merge(results)
+
+    @staticmethod
+    def merge(results):
+        devices = results.get("sink", []) + results.get("source", [])
+        seen = set(d['name'] for d in devices)
+        for dev in results.get("node", []):
+            if dev['name'] not in seen:
+                devices.append(dev)
+                seen.add(dev['name'])
+        return devices
+
+    @staticmethod
+    def query(kind):
+        import subprocess
+        if kind == "node":
+            return AudioDeviceManager._query_nodes()
         devices = []
         try:
-            result = subprocess.run(["pactl", "list", "sinks", "short"], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if not line: continue
-                    parts = line.split('\t')
-                    if len(parts) >= 2:
-                        node_id, name = parts[0], parts[1]
-                        display = AudioDeviceManager._format_display_name(name)
-                        devices.append({'id': name, 'node_id': node_id, 'name': name, 'display': f"[Sink] {display}", 'type': 'sink'})
-        except: pass
-        try:
-            result = subprocess.run(["pactl", "list", "sources", "short"], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if not line: continue
-                    parts = line.split('\t')
-                    if len(parts) >= 2:
-                        node_id, name = parts[0], parts[1]
-                        if '.monitor' not in name.lower():
-                            display = AudioDeviceManager._format_display_name(name)
-                            devices.append({'id': name, 'node_id': node_id, 'name': name, 'display': f"[Source] {display}", 'type': 'source'})
-        except: pass
+            result = subprocess.run(["pactl", "list", f"{kind}s", "short"], capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            return devices
+        if result.returncode != 0:
+            return devices
+        label = "[Sink]" if kind == "sink" else "[Source]"
+        for line in result.stdout.strip().split('\n'):
+            if not line: continue
+            parts = line.split('\t')
+            if len(parts) >= 2:
+                node_id, name = parts[0], parts[1]
+                if kind == "source" and '.monitor' in name.lower():
+                    continue
+                display = AudioDeviceManager._format_display_name(name)
+                devices.append({'id': name, 'node_id': node_id, 'name': name, 'display': f"{label} {display}", 'type': kind})
+        return devices
+
+    @staticmethod
+    def _query_nodes():
+        import subprocess
+        devices = []
         try:
             result = subprocess.run(["pw-link", "-o"], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                seen = set(d['name'] for d in devices)
-                for line in result.stdout.strip().split('\n'):
-                    if not line or ':' not in line: continue
-                    name = line.split(':')[0].strip()
-                    if name and name not in seen:
-                        display = AudioDeviceManager._format_display_name(name)
-                        devices.append({'id': name, 'node_id': '', 'name': name, 'display': f"[Node] {display}", 'type': 'node'})
-                        seen.add(name)
-        except: pass
+        except (OSError, subprocess.SubprocessError):
+            return devices
+        if result.returncode != 0:
+            return devices
+        seen = set()
+        for line in result.stdout.strip().split('\n'):
+            if not line or ':' not in line: continue
+            name = line.split(':')[0].strip()
+            if name and name not in seen:
+                display = AudioDeviceManager._format_display_name(name)
+                devices.append({'id': name, 'node_id': '', 'name': name, 'display': f"[Node] {display}", 'type': 'node'})
+                seen.add(name)
         return devices
     
     @staticmethod
@@ -188,12 +363,1932 @@ class AudioDeviceManager:
         return display if display else "Unknown Device"
 
 
+class ConfigStore:
+    def __init__(self, path=None):
+        self.path = Path(path or CONFIG_FILE)
+        self.sounds_path = self.path.with_name("sounds.json")
+        self.log_path = self.path.with_name("sounds.log")
+        self.cond = threading.Condition()
+        self.pending = None
+        self.busy = False
+        self.writing = False
+        self.replica = []
+        self.log_count = 0
+        self.log_gen = 0
+        self.needs_compact = False
+        self.log_mode = False
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                d = json.load(f)
+        except FileNotFoundError:
+            return {}, None
+        except (OSError, ValueError) as e:
+            broken = self.path.with_name(f"{self.path.name}.broken-{int(time.time())}")
+            try:
+                os.replace(self.path, broken)
+            except OSError:
+                pass
+            return {}, f"Config unreadable ({e}), kept as {broken.name}"
+        self.log_mode = d.get("library") == "log" and "categories" not in d
+        if self.log_mode:
+            d["sounds"] = self._load_log(d.get("sounds"))
+        return d, None
+
+    def _load_log(self, inline):
+        try:
+            with open(self.sounds_path) as f:
+                sounds = json.load(f)
+        except (OSError, ValueError):
+            sounds = inline or []
+            self.needs_compact = True
+        gen = 0
+        if isinstance(sounds, dict):
+            gen, sounds = sounds.get("gen", 0), sounds.get("sounds", [])
+        self.log_gen, self.log_count = gen, 0
+        try:
+            with open(self.log_path) as f:
+                for n, line in enumerate(f):
+                    try:
+                        op = json.loads(line)
+                        if n == 0 and (op[1] if op[0] == "gen" else 0) != gen:
+                            self.needs_compact = True
+                            break
+                        if op[0] != "gen":
+                            self.apply(sounds, op)
+                            self.log_count += 1
+                    except (ValueError, LookupError, TypeError):
+                        self.needs_compact = True
+                        break
+        except OSError:
+            pass
+        self.replica = [dict(s) for s in sounds]
+        return sounds
+
+    @staticmethod
+    def apply(sounds, op):
+        if op[0] == "add":
+            sounds.extend(op[1])
+        elif op[0] == "set":
+            sounds[op[1]] = op[2]
+        elif op[0] == "del":
+            del sounds[op[1]]
+
+    def save(self, settings=None, sounds=None, ops=()):
+        with self.cond:
+            ops = list(ops)
+            if self.pending:
+                p_settings, p_sounds, p_ops = self.pending
+                settings = settings if settings is not None else p_settings
+                if sounds is None:
+                    sounds, ops = p_sounds, p_ops + ops
+            self.pending = (settings, sounds, ops)
+            self.cond.notify_all()
+            if not self.writing:
+                self.writing = True
+                threading.Thread(target=self._writer, daemon=True).start()
+
+    def flush(self, timeout=5):
+        with self.cond:
+            self.cond.wait_for(lambda: self.pending is None and not self.busy, timeout)
+
+    def _writer(self):
+        while True:
+            with self.cond:
+                if not self.cond.wait_for(lambda: self.pending is not None, 5):
+                    self.writing = False
+                    return
+                job, self.pending, self.busy = self.pending, None, True
+            try:
+                self._write(*job)
+            except OSError as e:
+                print(f"linuxpad: failed to save config: {e}", file=sys.stderr)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def _write(self, settings, sounds, ops):
+        if self.log_mode:
+            if sounds is not None:
+                self.replica, self.needs_compact = sounds, True
+            for op in ops:
+                self.apply(self.replica, op)
+            if self.needs_compact or self.log_count + len(ops) > max(500, len(self.replica) // 4):
+                self._compact()
+            elif ops:
+                self._append(ops)
+        if settings is not None:
+            self.atomic_write(self.path, json.dumps(settings, indent=2))
+
+    def _append(self, ops):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a") as f:
+            if not f.tell():
+                f.write(json.dumps(["gen", self.log_gen]) + "\n")
+            f.write("".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops))
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_count += len(ops)
+
+    def _compact(self):
+        gen = self.log_gen + 1
+        self.atomic_write(self.sounds_path, json.dumps({"gen": gen, "sounds": self.replica}, separators=(",", ":")))
+        self.atomic_write(self.log_path, json.dumps(["gen", gen]) + "\n")
+        self.log_gen, self.log_count = gen, 0
+        self.needs_compact = False
+
+    @staticmethod
+    def atomic_write(path, text):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        try:
+            fd = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+class Library:
+    DEFAULT = {"id": "default", "name": "My Sounds"}
+    INDEX_KEYS = ("hotkey", "file", "loudness", "duration", "hash", "mtime", "size")
+
+    def __init__(self, root=None, mode="json"):
+        self.root = Path(root or Path(CONFIG_FILE).parent / "library")
+        self.mode = mode
+        self.stores = {}
+
+    def store(self, cid):
+        store = self.stores.get(cid)
+        if store is None:
+            store = self.stores[cid] = ConfigStore(self.root / cid / "config.json")
+            store.log_mode = self.mode == "log"
+        return store
+
+    def load(self, cid):
+        store = self.store(cid)
+        store.flush()
+        d, error = store.load()
+        if not d:
+            store.log_mode = self.mode == "log"
+        return d.get("sounds", []), error
+
+    def save(self, category, sounds=None, ops=()):
+        header = {"name": category["name"], "library": self.mode}
+        store = self.store(category["id"])
+        if store.log_mode:
+            store.save(header if sounds is not None else None, sounds, ops)
+        else:
+            store.save({**header, "sounds": sounds})
+
+    def append(self, category, entries):
+        store = self.store(category["id"])
+        if store.log_mode:
+            self.load(category["id"])
+            self.save(category, ops=[("add", entries)])
+        else:
+            sounds, _ = self.load(category["id"])
+            self.save(category, sounds + entries)
+        self.unload(category["id"])
+
+    def unload(self, cid):
+        store = self.stores.get(cid)
+        if store:
+            store.flush()
+            store.replica = []
+
+    def remove(self, cid):
+        self.unload(cid)
+        shutil.rmtree(self.root / cid, ignore_errors=True)
+
+    def flush(self):
+        for store in self.stores.values():
+            store.flush()
+
+    def new_id(self, name, categories):
+        base = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "category"
+        taken = {c["id"] for c in categories}
+        cid, n = base, 1
+        while cid in taken or (self.root / cid).exists():
+            n += 1
+            cid = f"{base}-{n}"
+        return cid
+
+    def migrate(self, d):
+        if "categories" in d:
+            return False
+        shards = sorted((p.parent.name for p in self.root.glob("*/config.json")), key=lambda c: (c != "default", c))
+        if "sounds" not in d and shards:
+            return self.recover(d, shards)
+        sounds = d.pop("sounds", [])
+        d["categories"] = [dict(self.DEFAULT)]
+        d["hotkeys"] = self.index(sounds, self.DEFAULT["id"])
+        self.save(self.DEFAULT, [dict(s) for s in sounds])
+        self.store(self.DEFAULT["id"]).flush()
+        return True
+
+    def recover(self, d, shards):
+        d["categories"], d["hotkeys"] = [], []
+        for cid in shards:
+            store = self.store(cid)
+            store.flush()
+            shard, error = store.load()
+            if error:
+                print(f"linuxpad: {error}", file=sys.stderr)
+            if not d["categories"]:
+                self.mode = d["library"] = shard.get("library", self.mode)
+            d["categories"].append({"id": cid, "name": shard.get("name", cid)})
+            d["hotkeys"] += self.index(shard.get("sounds", []), cid)
+            self.unload(cid)
+        return True
+
+    @classmethod
+    def index(cls, sounds, cid):
+        return [{**{k: s[k] for k in cls.INDEX_KEYS if k in s}, "category": cid}
+                for s in sounds if s.get("hotkey") and s.get("file")]
+
+    def load_all(self, categories):
+        sounds = []
+        for category in categories:
+            shard, error = self.load(category["id"])
+            if error:
+                print(f"linuxpad: {error}", file=sys.stderr)
+            sounds += [{**s, "category": category["id"]} for s in shard]
+            self.unload(category["id"])
+        return sounds
+
+
+def migrate_outputs(d):
+    if "outputs" in d:
+        return False
+    target = d.pop("target", "")
+    mic = [{"name": "Mic", "target": target, "gain": d.pop("vol_mic", 100), "enabled": True}] if target else []
+    d.pop("vol_mic", None)
+    d["outputs"] = mic + [{"name": "Local", "target": "", "gain": d.pop("vol_local", 50), "enabled": True}]
+    return True
+
+
+def find_output(outputs, name):
+    return next((o for o in outputs if o["name"].lower() == name.lower()), None)
+
+
+class AudioDecoder:
+    @staticmethod
+    def available():
+        return shutil.which("ffmpeg") is not None
+
+    @staticmethod
+    def command(fp, start=0.0):
+        seek = ["-ss", f"{start:.3f}"] if start > 0 else []
+        return ["ffmpeg", "-nostdin", "-v", "quiet", *seek, "-i", fp,
+                "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(RATE), "-"]
+
+    @staticmethod
+    def open(fp, start=0.0):
+        import subprocess
+        return subprocess.Popen(AudioDecoder.command(fp, start), stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+class DiskCache:
+    def __init__(self, root=None):
+        self.root = Path(root or CACHE_DIR)
+        self.index_file = self.root / "index.json"
+        self.lock = threading.Lock()
+        self.index = self._load()
+        self.known = {}
+        self.changed = {}
+        self.dirty = False
+        self.timer = None
+
+    def _load(self):
+        try:
+            with open(self.index_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.dirty = True
+        if self.timer is None:
+            self.timer = threading.Timer(2.0, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if self.dirty:
+                try:
+                    with self._locked():
+                        self._merge()
+                        self._write()
+                except OSError as e:
+                    print(f"linuxpad: failed to save cache index: {e}", file=sys.stderr)
+
+    def _locked(self):
+        import fcntl
+        self.root.mkdir(parents=True, exist_ok=True)
+        f = open(self.root / "index.lock", "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def _merge(self):
+        index = self._load()
+        for fp, e in self.changed.items():
+            if e is None:
+                index.pop(fp, None)
+            else:
+                index[fp] = e
+        self.index = index
+
+    def _write(self):
+        tmp = self.index_file.with_name(f"index.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_file)
+        self.changed, self.dirty = {}, False
+
+    def seed(self, entries):
+        self.known = entries
+
+    @staticmethod
+    def content_hash(fp):
+        import hashlib
+        h = hashlib.blake2b(f"s16le:{RATE}:{CHANNELS}:".encode(), digest_size=16)
+        with open(fp, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def pcm_path(self, digest):
+        return self.root / f"{digest}.pcm"
+
+    def entry(self, fp):
+        st = os.stat(fp)
+        with self.lock:
+            e = self.index.get(fp)
+        if e and e["mtime"] == st.st_mtime_ns and e["size"] == st.st_size:
+            return e["hash"]
+        known = self.known.get(fp)
+        if known and known["mtime"] == st.st_mtime_ns and known["size"] == st.st_size:
+            digest = known["hash"]
+        else:
+            digest = self.content_hash(fp)
+        with self.lock:
+            if e and e["hash"] != digest:
+                self._invalidate(fp)
+            self.index[fp] = self.changed[fp] = {"mtime": st.st_mtime_ns, "size": st.st_size, "hash": digest}
+            self._save()
+        return digest
+
+    def _invalidate(self, fp):
+        old = self.index.pop(fp, None)
+        if old:
+            self.changed[fp] = None
+        if old and not any(e["hash"] == old["hash"] for e in self.index.values()):
+            p = self.pcm_path(old["hash"])
+            try:
+                size = p.stat().st_size
+                p.unlink()
+                return size
+            except OSError:
+                pass
+        return 0
+
+    def lookup(self, fp):
+        p = self.pcm_path(self.entry(fp))
+        try:
+            os.utime(p)
+        except OSError:
+            return None
+        return p
+
+    def store(self, fp, data):
+        p = self.pcm_path(self.entry(fp))
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, p)
+        return p
+
+    def prune(self, cap_bytes):
+        removed, freed = 0, 0
+        with self.lock, self._locked():
+            self._merge()
+            for fp, e in list(self.index.items()):
+                try:
+                    st = os.stat(fp)
+                    if e["mtime"] == st.st_mtime_ns and e["size"] == st.st_size:
+                        continue
+                except OSError:
+                    pass
+                size = self._invalidate(fp)
+                if size:
+                    removed, freed = removed + 1, freed + size
+            live = {e["hash"] for e in self.index.values()}
+            files = []
+            for p in self.root.glob("*.pcm"):
+                st = p.stat()
+                if p.stem in live:
+                    files.append((st.st_mtime, st.st_size, p))
+                elif time.time() - st.st_mtime > 60:
+                    p.unlink()
+                    removed, freed = removed + 1, freed + st.st_size
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for _, size, p in files:
+                if total <= cap_bytes:
+                    break
+                p.unlink()
+                total -= size
+                removed, freed = removed + 1, freed + size
+                for fp in [fp for fp, e in self.index.items() if e["hash"] == p.stem]:
+                    del self.index[fp]
+            self._write()
+        return removed, freed, total
+
+
+def file_hashes(sounds):
+    return {s["file"]: {k: s[k] for k in ("mtime", "size", "hash")}
+            for s in sounds if s.get("file") and all(k in s for k in ("mtime", "size", "hash"))}
+
+
+class SharedBuffers:
+    def __init__(self, tag, segments=None, notify=None):
+        self.tag = tag
+        self.segments = dict(segments or {})
+        self.attached = {}
+        self.retired = []
+        self.notify = notify
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, fp):
+        from multiprocessing import shared_memory
+        key = SampleCache.key(fp)
+        with self.lock:
+            entry = self.segments.get(key)
+            if entry is None:
+                return None
+            shm = self.attached.get(key)
+            if shm is None:
+                try:
+                    shm = self.attached[key] = shared_memory.SharedMemory(entry[0])
+                except OSError:
+                    self._drop(key)
+                    return None
+            return shm.buf[:entry[1]]
+
+    def store(self, fp, data):
+        from multiprocessing import shared_memory
+        key = SampleCache.key(fp)
+        with self.lock:
+            self.count += 1
+            shm = shared_memory.SharedMemory(f"{self.tag}-{os.getpid()}-{self.count}", create=True, size=max(1, len(data)))
+            shm.buf[:len(data)] = data
+            self._drop(key)
+            self.attached[key] = shm
+            self.segments[key] = (shm.name, len(data))
+        if self.notify:
+            self.notify(("segment", key, shm.name, len(data)))
+        return shm.buf[:len(data)]
+
+    def release(self, key):
+        with self.lock:
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self.segments.pop(key, None)
+        shm = self.attached.pop(key, None)
+        if entry is None:
+            return
+        if shm is None:
+            self.unlink(entry[0])
+        else:
+            shm.unlink()
+            self.retired.append(shm)
+        for old in list(self.retired):
+            try:
+                old.close()
+            except BufferError:
+                continue
+            self.retired.remove(old)
+        if self.notify:
+            self.notify(("segment", key, None, 0))
+
+    def close(self):
+        with self.lock:
+            for key in list(self.segments):
+                self._drop(key)
+
+    @staticmethod
+    def unlink(name):
+        from multiprocessing import shared_memory
+        try:
+            shm = shared_memory.SharedMemory(name)
+        except OSError:
+            return
+        shm.unlink()
+        shm.close()
+
+
+class AudioProbe:
+    @staticmethod
+    def probe(fp):
+        import subprocess
+        import wave
+        if Path(fp).suffix.lower() == ".wav":
+            try:
+                with wave.open(fp) as w:
+                    return {"duration": round(w.getnframes() / w.getframerate(), 3),
+                            "rate": w.getframerate(), "channels": w.getnchannels()}
+            except (OSError, EOFError, wave.Error, ZeroDivisionError):
+                pass
+        try:
+            result = subprocess.run(["ffprobe", "-v", "quiet", "-print_format", "json", "-select_streams", "a:0",
+                                     "-show_entries", "stream=sample_rate,channels:format=duration", fp],
+                                    capture_output=True, text=True, timeout=10)
+            info = json.loads(result.stdout or "{}")
+        except (OSError, subprocess.SubprocessError, ValueError):
+            return {}
+        meta = {}
+        streams = info.get("streams") or [{}]
+        try:
+            meta["duration"] = round(float(info.get("format", {})["duration"]), 3)
+        except (KeyError, TypeError, ValueError):
+            pass
+        if streams[0].get("sample_rate"):
+            meta["rate"] = int(streams[0]["sample_rate"])
+        if streams[0].get("channels"):
+            meta["channels"] = int(streams[0]["channels"])
+        return meta
+
+
+class PeakCache:
+    MAGIC = b"LPK1"
+    RECORD = 20 + 2 * PEAK_BINS
+
+    def __init__(self, path=None):
+        self.path = Path(path or CACHE_DIR / "peaks.bin")
+        self.lock = threading.Lock()
+        self.records = None
+
+    @staticmethod
+    def key(fp):
+        import hashlib
+        st = os.stat(fp)
+        return hashlib.blake2b(f"{fp}\0{st.st_mtime_ns}\0{st.st_size}".encode(), digest_size=16).digest()
+
+    def _load(self):
+        try:
+            data = self.path.read_bytes()
+        except OSError:
+            return {}
+        if data[:4] != self.MAGIC:
+            return {}
+        end = len(data) - (len(data) - 4) % self.RECORD
+        if end != len(data):
+            try:
+                os.truncate(self.path, end)
+            except OSError:
+                pass
+        records = {}
+        for off in range(4, end, self.RECORD):
+            records[data[off:off + 16]] = (struct.unpack_from("<f", data, off + 16)[0], data[off + 20:off + self.RECORD])
+        return records
+
+    def get(self, key):
+        with self.lock:
+            if self.records is None:
+                self.records = self._load()
+            return self.records.get(key)
+
+    def put(self, key, duration, peaks):
+        with self.lock:
+            if self.records is None:
+                self.records = self._load()
+            self.records[key] = (duration, peaks)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as f:
+                    if f.tell() == 0:
+                        f.write(self.MAGIC)
+                    f.write(key + struct.pack("<f", duration) + peaks)
+            except OSError:
+                pass
+
+    @staticmethod
+    def measure(fp, alive=lambda: True):
+        proc = AudioDecoder.open(fp)
+        block = PERIOD_FRAMES * CHANNELS
+        lows, highs, total = [], [], 0
+        try:
+            while True:
+                if not alive():
+                    proc.kill()
+                    return False
+                chunk = proc.stdout.read(block * 200)
+                if not chunk:
+                    break
+                total += len(chunk)
+                pcm = np.frombuffer(chunk, dtype=np.int16, count=len(chunk) // 2)
+                starts = np.arange(0, len(pcm), block)
+                lows.append(np.minimum.reduceat(pcm, starts))
+                highs.append(np.maximum.reduceat(pcm, starts))
+        except (OSError, ValueError):
+            pass
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        if not lows:
+            return None
+        lo, hi = np.concatenate(lows), np.concatenate(highs)
+        starts = np.minimum(np.linspace(0, len(lo), PEAK_BINS, endpoint=False).astype(np.intp), len(lo) - 1)
+        lo = np.minimum.reduceat(lo, starts) >> 8
+        hi = np.maximum.reduceat(hi, starts) >> 8
+        return total / (RATE * FRAME_BYTES), np.stack([lo, hi], axis=1).astype(np.int8).tobytes()
+
+
+class LoudnessMeter:
+    FIR_TAPS = 4096
+    CHUNK_FRAMES = RATE // 10 * 8
+    filters = None
+
+    @staticmethod
+    def stamp(fp):
+        st = os.stat(fp)
+        return st.st_mtime_ns, st.st_size
+
+    @classmethod
+    def fresh(cls, fp, record):
+        try:
+            return bool(record) and (record.get("mtime"), record.get("size")) == cls.stamp(fp)
+        except OSError:
+            return True
+
+    @classmethod
+    def _filters(cls):
+        if cls.filters is None:
+            h = [1.0] + [0.0] * (cls.FIR_TAPS - 1)
+            for b, a in K_WEIGHTING:
+                x1 = x2 = y1 = y2 = 0.0
+                out = []
+                for x in h:
+                    y = b[0] * x + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+                    x2, x1, y2, y1 = x1, x, y1, y
+                    out.append(y)
+                h = out
+            n = np.arange(48)
+            proto = np.sinc((n - 23.5) / 4) * np.hanning(48)
+            phases = [proto[p::4] / proto[p::4].sum() for p in range(4)]
+            nfft = 1 << (cls.CHUNK_FRAMES + cls.FIR_TAPS - 2).bit_length()
+            cls.filters = nfft, [np.fft.rfft(f, nfft)[:, None] for f in [np.array(h)] + phases]
+        return cls.filters
+
+    @classmethod
+    def chunks(cls, stream, stop=None):
+        size = cls.CHUNK_FRAMES * FRAME_BYTES
+        while not (stop and stop()):
+            data = stream.read(size)
+            if not data:
+                return
+            yield data
+
+    @classmethod
+    def measure(cls, chunks):
+        if np is None:
+            return None
+        nfft, (k_weight, *phases) = cls._filters()
+        hist = cls.FIR_TAPS - 1
+        sub = RATE // 10
+        subs, rest = [], np.zeros(0)
+        frames, total, peak = 0, 0.0, 0.0
+        tail = np.zeros((hist, CHANNELS), dtype=np.float64)
+        for data in chunks:
+            n = len(data) // FRAME_BYTES
+            if n == 0:
+                continue
+            pcm = np.frombuffer(data, dtype=np.int16, count=n * CHANNELS).reshape(n, CHANNELS)
+            chunk = pcm.astype(np.float64) / 32768.0
+            seg = np.concatenate((tail, chunk))
+            tail = seg[-hist:]
+            spec = np.fft.rfft(seg, nfft, axis=0)
+            y = np.fft.irfft(spec * k_weight, nfft, axis=0)[hist:hist + n]
+            energy = np.square(y).sum(axis=1)
+            frames, total = frames + n, total + float(energy.sum())
+            energy = np.concatenate((rest, energy))
+            whole = len(energy) // sub * sub
+            subs.append(energy[:whole].reshape(-1, sub).mean(axis=1))
+            rest = energy[whole:]
+            for h in phases:
+                up = np.fft.irfft(spec * h, nfft, axis=0)[hist:hist + n]
+                peak = max(peak, float(np.abs(up).max()))
+            peak = max(peak, float(np.abs(pcm).max()) / 32768.0)
+        if frames == 0:
+            return None
+        subs = np.concatenate(subs)
+        if len(subs) < 4:
+            blocks = np.array([total / frames])
+        else:
+            blocks = np.convolve(subs, np.full(4, 0.25), "valid")
+        gated = blocks[blocks > 10 ** ((-70 + 0.691) / 10)]
+        if len(gated):
+            gated = gated[gated > gated.mean() * 0.1]
+        lufs = round(-0.691 + 10 * math.log10(gated.mean()), 2) if len(gated) else None
+        return {"lufs": lufs, "peak": round(20 * math.log10(peak), 2) if peak > 0 else None}
+
+
+def clip_gain(entry, target_lufs):
+    record = entry.get("loudness") or {}
+    if record.get("lufs") is None:
+        return 1.0
+    db = target_lufs - record["lufs"]
+    if db > 0:
+        db = min(db, MAX_BOOST_DB, max(0.0, TRUE_PEAK_CEILING - (record.get("peak") or 0.0)))
+    return 10 ** (db / 20)
+
+
+def clip_gains(sounds, target_lufs):
+    return {s["file"]: clip_gain(s, target_lufs) for s in sounds if s.get("file") and s.get("loudness")}
+
+
+class Sample:
+    def __init__(self, path, disk=None, perf=None, shared=None):
+        self.path = path
+        self.disk = disk
+        self.perf = perf
+        self.shared = shared
+        self.data = bytearray()
+        self.view = None
+        self.mapped = False
+        self.done = False
+        self.ok = False
+        self.rms = None
+        self.proc = None
+
+    def decode(self, wait=False):
+        if wait:
+            self._load()
+        else:
+            threading.Thread(target=self._load, daemon=True).start()
+        return self
+
+    def memory(self):
+        return 0 if self.mapped else len(self.data)
+
+    def level(self):
+        if self.rms is None and self.view is not None:
+            self.rms = pcm_rms(self.view)
+        return self.rms or 0.0
+
+    def read(self, pos, nbytes, reader=None):
+        view = self.view
+        if view is not None:
+            chunk = view[pos:pos + nbytes]
+            return chunk, len(chunk) < nbytes
+        return bytes(self.data[pos:pos + nbytes]), False
+
+    def map(self, pcm_path):
+        import mmap
+        with open(pcm_path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data, self.view, self.mapped = data, memoryview(data), True
+        self.ok = True
+
+    def _load(self):
+        try:
+            self._fetch()
+        except BaseException:
+            self.ok = False
+            raise
+        finally:
+            self.done = True
+
+    def _fetch(self):
+        if self.shared:
+            try:
+                buf = self.shared.lookup(self.path)
+                if buf is not None:
+                    self.data, self.view = buf, buf
+                    self.ok = True
+                    return
+            except (OSError, ValueError):
+                pass
+        if self.disk:
+            try:
+                pcm = self.disk.lookup(self.path)
+                if pcm:
+                    self.map(pcm)
+                    return
+            except (OSError, ValueError):
+                pass
+        t0 = time.perf_counter()
+        self.proc = AudioDecoder.open(self.path)
+        self._read()
+        if self.ok and self.perf:
+            self.perf.observe("decode", time.perf_counter() - t0)
+        if self.ok and self.disk:
+            try:
+                self.map(self.disk.store(self.path, self.data))
+            except (OSError, ValueError):
+                pass
+        if self.ok and self.shared:
+            try:
+                self.data = self.view = self.shared.store(self.path, self.data)
+            except (OSError, ValueError):
+                pass
+
+    def _read(self):
+        try:
+            while True:
+                chunk = self.proc.stdout.read(65536)
+                if not chunk:
+                    break
+                self.data += chunk
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.proc.stdout.close()
+            self.ok = self.proc.wait() == 0 and len(self.data) > 0
+            self.data = bytes(self.data)
+            self.view = memoryview(self.data)
+
+
+def pcm_rms(buf):
+    if np is not None:
+        pcm = np.frombuffer(buf, dtype=np.int16, count=len(buf) // 2)
+        return float(np.sqrt(np.mean(np.square(pcm, dtype=np.float64)))) if len(pcm) else 0.0
+    if audioop:
+        return float(audioop.rms(buf, 2))
+    return 0.0
+
+
+class Stream:
+    def __init__(self, path, start=0, seconds=STREAM_BUFFER_SECONDS, perf=None):
+        self.path = path
+        self.perf = perf
+        self.cap = int(seconds * RATE) * FRAME_BYTES
+        self.ring = bytearray(self.cap)
+        self.cond = threading.Condition()
+        self.readers = {}
+        self.proc = None
+        self.gen = 0
+        self.base = self.head = 0
+        self.eof = False
+        self.closed = False
+        self.ok = True
+        self.done = False
+        self.mapped = False
+        self.underruns = 0
+        self.seek(start)
+
+    def memory(self):
+        return self.cap
+
+    def level(self):
+        with self.cond:
+            buf = bytes(self.ring[:min(self.cap, self.head - self.base)])
+        return pcm_rms(buf)
+
+    def seek(self, pos):
+        pos -= pos % FRAME_BYTES
+        with self.cond:
+            self.gen += 1
+            gen = self.gen
+            self.base = self.head = pos
+            self.eof = self.done = False
+            self.readers.clear()
+            old, self.proc = self.proc, AudioDecoder.open(self.path, pos / (RATE * FRAME_BYTES))
+            self.cond.notify_all()
+        if old and old.poll() is None:
+            old.kill()
+        threading.Thread(target=self._fill, args=(self.proc, gen), daemon=True).start()
+        return pos
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.gen += 1
+            proc = self.proc
+            self.cond.notify_all()
+        if proc and proc.poll() is None:
+            proc.kill()
+
+    def _low(self):
+        now = time.monotonic()
+        live = [p for p, t in self.readers.values() if now - t < 0.5]
+        if live:
+            return min(live)
+        return min((p for p, _ in self.readers.values()), default=self.base)
+
+    def _fill(self, proc, gen):
+        try:
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: gen != self.gen or self.head - self._low() < self.cap - 65536)
+                    if gen != self.gen:
+                        return
+                    room = self.cap - (self.head - self._low())
+                chunk = proc.stdout.read(min(room, 65536))
+                if not chunk:
+                    break
+                with self.cond:
+                    if gen != self.gen:
+                        return
+                    i = self.head % self.cap
+                    first = min(len(chunk), self.cap - i)
+                    self.ring[i:i + first] = chunk[:first]
+                    self.ring[:len(chunk) - first] = chunk[first:]
+                    self.head += len(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            code = proc.wait()
+            with self.cond:
+                if gen == self.gen:
+                    self.eof = True
+                    self.ok = code == 0 or self.head > self.base
+                    self.cond.notify_all()
+
+    def read(self, pos, nbytes, reader=None):
+        with self.cond:
+            pos = max(pos, self.base, self.head - self.cap)
+            if reader is not None:
+                reader.pos = pos
+            self.readers[id(reader)] = (pos, time.monotonic())
+            take = max(0, min(nbytes, self.head - pos))
+            i = pos % self.cap
+            first = min(take, self.cap - i)
+            chunk = bytes(self.ring[i:i + first]) + bytes(self.ring[:take - first])
+            eof = self.eof and pos + take >= self.head
+            if take < nbytes and not eof:
+                self.underruns += 1
+                if self.perf:
+                    self.perf.count("underruns")
+            self.done = eof
+            self.cond.notify_all()
+        return chunk, eof
+
+
+class SampleCache:
+    def __init__(self, budget_mb=256, disk=None, perf=None, shared=None):
+        self.budget = budget_mb * 1024 * 1024
+        self.disk = disk
+        self.perf = perf
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.keys = {}
+        self.sizes = {}
+        self.pending = set()
+        self.total = 0
+        self.mapped = 0
+        self.pinned = set()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self.warm_thread = None
+        self.warm_queue = []
+
+    @staticmethod
+    def key(fp):
+        st = os.stat(fp)
+        return (fp, st.st_mtime_ns, st.st_size)
+
+    def get(self, fp):
+        key = self.key(fp)
+        with self.lock:
+            sample = self.entries.get(key)
+            if sample is not None and (sample.ok or not sample.done):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return sample
+            self.misses += 1
+            return self._insert(key, Sample(fp, self.disk, self.perf, self.shared).decode())
+
+    def _insert(self, key, sample):
+        old = self.keys.get(key[0])
+        if old is not None and old != key and old in self.entries:
+            self._drop(old)
+        self.keys[key[0]] = key
+        self.entries[key] = sample
+        self._account(key)
+        self.evict()
+        return sample
+
+    def _account(self, key):
+        sample = self.entries[key]
+        size, mapped = self.sizes.get(key, (0, False))
+        self.sizes[key] = sample.memory(), sample.mapped
+        self.total += self.sizes[key][0] - size
+        self.mapped += self.sizes[key][1] - mapped
+        if sample.done:
+            self.pending.discard(key)
+        else:
+            self.pending.add(key)
+
+    def _drop(self, key):
+        del self.entries[key]
+        size, mapped = self.sizes.pop(key, (0, False))
+        self.total -= size
+        self.mapped -= mapped
+        self.pending.discard(key)
+        if self.keys.get(key[0]) == key:
+            del self.keys[key[0]]
+        if self.shared:
+            self.shared.release(key)
+
+    def used(self):
+        with self.lock:
+            for key in list(self.pending):
+                self._account(key)
+            return self.total
+
+    def evict(self):
+        with self.lock:
+            total, mapped = self.used(), self.mapped
+            victims = []
+            for key, sample in self.entries.items():
+                if total <= self.budget and mapped <= MAX_MAPPED_SAMPLES:
+                    break
+                if key[0] in self.pinned or not sample.done or total <= self.budget and not sample.mapped:
+                    continue
+                victims.append(key)
+                total -= self.sizes[key][0]
+                mapped -= self.sizes[key][1]
+            for key in victims:
+                self._drop(key)
+
+    def pin(self, paths):
+        with self.lock:
+            self.pinned = set(paths)
+        self.warm(paths)
+
+    def warm(self, paths):
+        with self.lock:
+            self.warm_queue = [p for p in paths if p not in self.warm_queue] + self.warm_queue
+            if self.warm_thread and self.warm_thread.is_alive():
+                return
+            self.warm_thread = threading.Thread(target=self._warm, daemon=True)
+            self.warm_thread.start()
+
+    def _warm(self):
+        while True:
+            with self.lock:
+                if not self.warm_queue:
+                    return
+                fp = self.warm_queue.pop(0)
+            try:
+                key = self.key(fp)
+            except OSError:
+                continue
+            with self.lock:
+                if key in self.entries:
+                    continue
+                sample = Sample(fp, self.disk, self.perf, self.shared)
+                self._insert(key, sample)
+            sample.decode(wait=True)
+            self.evict()
+
+    def stats(self):
+        with self.lock:
+            mapped = sum(len(s.data) for s in self.entries.values() if s.mapped)
+        return {"used": self.used(), "mapped": mapped, "budget": self.budget, "entries": len(self.entries),
+                "hits": self.hits, "misses": self.misses}
+
+
+class Playback:
+    def __init__(self, sample, started=None):
+        self.sample = sample
+        self.path = sample.path
+        self.started = started or time.monotonic()
+        self.voices = []
+        self.stopped = False
+        self.heard = False
+
+    def finished(self):
+        return self.stopped or all(v.done for v in self.voices)
+
+
+class Voice:
+    def __init__(self, sample, playback=None, gain=1.0, pos=0, at=None, items=None, loop=False):
+        self.sample = sample
+        self.playback = playback
+        self.gain = gain
+        self.pos = pos
+        self.at = at
+        self.items = items
+        self.index = 0
+        self.loop = loop
+        self.done = False
+
+    def read(self, nbytes):
+        chunk, self.done = self.sample.read(self.pos, nbytes, self)
+        self.pos += len(chunk)
+        skips = 0
+        while self.done and len(chunk) < nbytes and skips <= len(self.items or ()) and self.advance():
+            more, self.done = self.sample.read(0, nbytes - len(chunk), self)
+            self.pos = len(more)
+            skips = 0 if more else skips + 1
+            chunk = bytes(chunk) + bytes(more)
+        return chunk
+
+    def clone(self):
+        voice = Voice(self.sample, self.playback, self.gain, self.pos, self.at, self.items, self.loop)
+        voice.index = self.index
+        return voice
+
+    def advance(self):
+        if self.items is None:
+            return False
+        i = self.index + 1
+        if i >= len(self.items):
+            if not self.loop:
+                return False
+            i = 0
+        self.index = i
+        self.sample, self.gain = self.items[i]
+        return True
+
+
+def soft_clip(v):
+    knee = SOFT_KNEE * 32767
+    if -knee <= v <= knee:
+        return int(v)
+    over = (abs(v) - knee) / (32767 - knee)
+    out = knee + (32767 - knee) * over / (1 + over)
+    return int(out if v > 0 else -out)
+
+
+def mix_blocks(chunks, gain, nbytes, start_gain=None, gains=None):
+    if start_gain is None:
+        start_gain = gain
+    if start_gain == gain:
+        if gain == 0.0 or not chunks:
+            return bytes(nbytes)
+        if len(chunks) == 1 and gain == 1.0 and not gains and len(chunks[0]) == nbytes:
+            return chunks[0]
+    gains = gains or [1.0] * len(chunks)
+    if np is not None:
+        acc = np.zeros(nbytes // 2, dtype=np.float32)
+        for chunk, g in zip(chunks, gains):
+            n = len(chunk) // 2
+            if g == 1.0:
+                acc[:n] += np.frombuffer(chunk, dtype=np.int16, count=n)
+            else:
+                acc[:n] += np.frombuffer(chunk, dtype=np.int16, count=n) * np.float32(g)
+        if start_gain != gain:
+            ramp = np.linspace(start_gain, gain, nbytes // FRAME_BYTES, dtype=np.float32)
+            acc *= np.repeat(ramp, CHANNELS) / 32767.0
+        else:
+            acc *= gain / 32767.0
+        mag = np.abs(acc)
+        over = mag > SOFT_KNEE
+        if over.any():
+            x = (mag[over] - SOFT_KNEE) / (1 - SOFT_KNEE)
+            acc[over] = np.sign(acc[over]) * (SOFT_KNEE + (1 - SOFT_KNEE) * np.tanh(x))
+        return (acc * 32767).astype(np.int16).tobytes()
+    if audioop and sum(audioop.max(c, 2) * g for c, g in zip(chunks, gains)) * max(gain, start_gain) <= SOFT_KNEE * 32767:
+        out = bytes(nbytes)
+        for chunk, g in zip(chunks, gains):
+            if len(chunk) < nbytes:
+                chunk = bytes(chunk) + bytes(nbytes - len(chunk))
+            out = audioop.add(out, audioop.mul(chunk, 2, g) if g != 1.0 else chunk, 2)
+        if start_gain == gain:
+            return audioop.mul(out, 2, gain) if gain != 1.0 else out
+        steps = 8
+        seg = nbytes // FRAME_BYTES // steps * FRAME_BYTES
+        return b"".join(audioop.mul(out[i * seg:(i + 1) * seg if i < steps - 1 else nbytes], 2,
+                                    start_gain + (gain - start_gain) * (i + 1) / steps) for i in range(steps))
+    from array import array
+    acc = [0] * (nbytes // 2)
+    for chunk, g in zip(chunks, gains):
+        samples = array("h")
+        samples.frombytes(chunk)
+        for i, v in enumerate(samples):
+            acc[i] += v * g
+    if start_gain == gain:
+        return array("h", (soft_clip(v * gain) for v in acc)).tobytes()
+    step = (gain - start_gain) / len(acc)
+    return array("h", (soft_clip(v * (start_gain + step * i)) for i, v in enumerate(acc))).tobytes()
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        n = sum(self.counts)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if n and seen >= q * n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return None
+
+    def summary(self, scale):
+        n = sum(self.counts)
+        if not n:
+            return {"n": 0}
+        return {"avg": round(self.sum / n * scale, 3), "p50": round(self.quantile(0.50) * scale, 3),
+                "p95": round(self.quantile(0.95) * scale, 3), "max": round(self.max * scale, 3), "n": n}
+
+    def prometheus(self, name, help_text):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        seen = 0
+        for bound, c in zip(self.bounds, self.counts):
+            seen += c
+            lines.append(f'{name}_bucket{{le="{bound:g}"}} {seen}')
+        lines += [f'{name}_bucket{{le="+Inf"}} {sum(self.counts)}', f"{name}_sum {self.sum:.6f}",
+                  f"{name}_count {sum(self.counts)}"]
+        return lines
+
+
+class PlaybackStats:
+    TRIGGER_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.03, 0.05, 0.1, 0.2, 0.5, 1.0)
+    DECODE_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    MIX_BOUNDS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+    CONNECT_BOUNDS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.trigger = Histogram(self.TRIGGER_BOUNDS)
+        self.decode = Histogram(self.DECODE_BOUNDS)
+        self.mix = Histogram(self.MIX_BOUNDS)
+        self.connect = Histogram(self.CONNECT_BOUNDS)
+        self.underruns = 0
+        self.xruns = 0
+        self.errors = 0
+        self.switches = 0
+        self.reconnects = 0
+        self.started = time.monotonic()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            getattr(self, name).observe(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self, cache, voices):
+        lookups = cache["hits"] + cache["misses"]
+        with self.lock:
+            return {"uptime": round(time.monotonic() - self.started, 1), "voices": voices,
+                    "trigger_ms": self.trigger.summary(1e3), "decode_ms": self.decode.summary(1e3),
+                    "mix_cpu_us": self.mix.summary(1e6), "period_us": round(PERIOD_FRAMES / RATE * 1e6),
+                    "connect_ms": self.connect.summary(1e3), "switches": self.switches, "reconnects": self.reconnects,
+                    "underruns": self.underruns, "xruns": self.xruns, "errors": self.errors,
+                    "cache_hits": cache["hits"], "cache_misses": cache["misses"],
+                    "cache_hit_rate": round(cache["hits"] / lookups, 4) if lookups else None,
+                    "cache_used": cache["used"]}
+
+    def prometheus(self, cache, voices):
+        counters = [("underruns", "Stream reads that found the ring buffer short", self.underruns),
+                    ("xruns", "Mixer periods written too late to keep the output pipe fed", self.xruns),
+                    ("play_errors", "Plays that failed to open their source", self.errors),
+                    ("output_switches", "Output target changes crossfaded to a new stream", self.switches),
+                    ("output_reconnects", "Output streams reopened after their device came back", self.reconnects),
+                    ("cache_hits", "Sample cache hits", cache["hits"]),
+                    ("cache_misses", "Sample cache misses", cache["misses"])]
+        with self.lock:
+            lines = self.trigger.prometheus("linuxpad_trigger_latency_seconds", "Time from play() to the first written block")
+            lines += self.decode.prometheus("linuxpad_decode_seconds", "Time to decode a sample into memory")
+            lines += self.mix.prometheus("linuxpad_mixer_cpu_seconds", "Mixer thread CPU time per period")
+            lines += self.connect.prometheus("linuxpad_output_connect_seconds", "Time from opening an output stream until it consumes audio")
+            for name, help_text, value in counters:
+                lines += [f"# HELP linuxpad_{name}_total {help_text}", f"# TYPE linuxpad_{name}_total counter",
+                          f"linuxpad_{name}_total {value}"]
+        lines += ["# HELP linuxpad_active_voices Sounds currently playing", "# TYPE linuxpad_active_voices gauge",
+                  f"linuxpad_active_voices {voices}", "# HELP linuxpad_cache_bytes Decoded audio held in RAM",
+                  "# TYPE linuxpad_cache_bytes gauge", f"linuxpad_cache_bytes {cache['used']}"]
+        return "\n".join(lines) + "\n"
+
+
+class OutputStream:
+    def __init__(self, name, target="", gain=1.0, perf=None):
+        self.name = name
+        self.target = target
+        self.gain = gain
+        self.perf = perf
+        self.applied_gain = gain
+        self.voices = []
+        self.lock = threading.Lock()
+        self.proc = None
+        self.thread = None
+        self.running = False
+        self.frame = 0
+        self.origin = time.monotonic()
+        self.grid = None
+        self.level = 1.0
+        self.fade_to = 1.0
+        self.fade_step = 0.0
+        self.opened = None
+        self.flowed = None
+        self.missing = False
+        self.seen = False
+        self.on_write = None
+
+    def command(self):
+        cmd = ["pw-play", "--raw", "--format", "s16", "--rate", str(RATE), "--channels", str(CHANNELS),
+               "--latency", f"{PERIOD_FRAMES}/{RATE}"]
+        if self.target:
+            cmd += ["--target", self.target]
+        return cmd + ["-"]
+
+    def alive(self):
+        return self.running and self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        import subprocess
+        self.stop()
+        self.proc = subprocess.Popen(self.command(), stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            import fcntl
+            fcntl.fcntl(self.proc.stdin.fileno(), getattr(fcntl, "F_SETPIPE_SZ", 1031), PIPE_BYTES)
+        except (ImportError, OSError):
+            pass
+        self.running = True
+        self.frame, self.origin, self.grid = 0, time.monotonic(), None
+        self.opened, self.flowed = time.monotonic(), None
+        self.thread = threading.Thread(target=self._run, args=(self.proc,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        import subprocess
+        self.running = False
+        proc, self.proc = self.proc, None
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def add(self, voice):
+        if not self.alive():
+            self.start()
+        with self.lock:
+            self.voices.append(voice)
+
+    def clear(self):
+        with self.lock:
+            self.voices.clear()
+
+    def remove(self, playback):
+        with self.lock:
+            self.voices = [v for v in self.voices if v.playback is not playback]
+
+    def flowing(self):
+        return self.flowed is not None and self.alive()
+
+    def fade(self, level, seconds):
+        self.fade_to = level
+        self.fade_step = (level - self.level) / max(1.0, seconds * RATE / PERIOD_FRAMES)
+
+    def handover(self, other, seconds=CROSSFADE_SECONDS):
+        with self.lock:
+            voices = self.voices
+            self.voices = [v.clone() for v in voices if v.at is None]
+        for v in voices:
+            if v.at is not None:
+                v.at = other.frame_at(self.origin + v.at / RATE)
+        with other.lock:
+            other.voices = voices + other.voices
+        self.fade(0.0, seconds)
+        other.fade(1.0, seconds)
+
+    def frame_at(self, t):
+        return round((t - self.origin) * RATE)
+
+    def schedule(self, at=None, step=0.0, epoch=0.0):
+        if at is None and not step:
+            return None
+        frame = self.frame + PERIOD_FRAMES
+        if at is not None:
+            frame = max(frame, self.frame_at(at))
+        if step:
+            if self.grid is None or self.grid[0] != epoch:
+                self.grid = (epoch, self.frame_at(epoch))
+            origin = self.grid[1]
+            frame = origin + round(math.ceil((frame - origin) / step) * step)
+        return frame
+
+    def _run(self, proc):
+        nbytes = PERIOD_FRAMES * FRAME_BYTES
+        silence = bytes(nbytes)
+        slack = (PIPE_BYTES + nbytes) / (RATE * FRAME_BYTES)
+        perf = self.perf
+        last = time.monotonic()
+        try:
+            import fcntl
+            import termios
+            fd = proc.stdin.fileno()
+            queued = lambda: struct.unpack("i", fcntl.ioctl(fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+            queued()
+        except (ImportError, OSError, ValueError):
+            queued = None
+        while self.running and proc is self.proc:
+            with self.lock:
+                voices = list(self.voices)
+            if self.fade_step:
+                self.level += self.fade_step
+                if (self.fade_step > 0) == (self.level >= self.fade_to):
+                    self.level, self.fade_step = self.fade_to, 0.0
+            gain = self.gain * self.level
+            fresh = []
+            start, end = self.frame, self.frame + PERIOD_FRAMES
+            if voices:
+                cpu = time.thread_time()
+                chunks = []
+                for v in voices:
+                    if v.at is None or v.at <= start:
+                        v.at = None
+                        chunks.append(v.read(nbytes))
+                    elif v.at < end:
+                        lead = (v.at - start) * FRAME_BYTES
+                        v.at = None
+                        chunks.append(bytes(lead) + bytes(v.read(nbytes - lead)))
+                    else:
+                        chunks.append(b"")
+                gains = [v.gain for v in voices] if any(v.gain != 1.0 for v in voices) else None
+                block = mix_blocks(chunks, gain, nbytes, self.applied_gain, gains)
+                with self.lock:
+                    self.voices = [v for v in self.voices if not v.done]
+                if perf:
+                    perf.observe("mix", time.thread_time() - cpu)
+                    fresh = [v.playback for v, c in zip(voices, chunks) if c and v.playback and not v.playback.heard]
+            else:
+                block = silence
+            self.applied_gain = gain
+            try:
+                if perf and self.frame and (queued() == 0 if queued else time.monotonic() - last > slack):
+                    perf.count("xruns")
+                proc.stdin.write(block)
+                proc.stdin.flush()
+                if self.on_write:
+                    self.on_write(block)
+                if self.flowed is None and (queued() < end * FRAME_BYTES if queued else end * FRAME_BYTES > 2 * PIPE_BYTES):
+                    self.flowed = time.monotonic()
+                    if perf:
+                        perf.observe("connect", self.flowed - self.opened)
+            except (OSError, ValueError):
+                break
+            last = time.monotonic()
+            self.origin = min(last - end / RATE, self.origin + (last - end / RATE - self.origin) * 0.001)
+            self.frame = end
+            for pb in fresh:
+                if not pb.heard:
+                    pb.heard = True
+                    perf.observe("trigger", last - pb.started)
+        if proc is self.proc:
+            self.running = False
+        try:
+            proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+
+class PlaybackEngine:
+    def __init__(self, cache_mb=256, disk_cache=True, max_voices=16, steal="oldest", stream_seconds=60, quantize=(0, 4),
+                 shared=None):
+        self.outputs = {}
+        self.switching = {}
+        self.devices = None
+        self.stats = PlaybackStats()
+        self.cache = SampleCache(cache_mb, DiskCache() if disk_cache else None, self.stats, None if disk_cache else shared)
+        self.max_voices = max_voices
+        self.steal = steal
+        self.stream_seconds = stream_seconds
+        self.playing = []
+        self.clip_gains = {}
+        self.durations = {}
+        self.probed = {}
+        self.stopped_at = {}
+        self.step = 0.0
+        self.epoch = time.monotonic()
+        self.set_quantize(*quantize)
+        self.lock = threading.RLock()
+        self.exporter = None
+        self.export_thread = None
+        self.closed = threading.Event()
+        if np is None:
+            threading.Thread(target=load_numpy, daemon=True).start()
+
+    @staticmethod
+    def available():
+        return shutil.which("pw-play") is not None and AudioDecoder.available()
+
+    @classmethod
+    def from_settings(cls, d, shared=None):
+        engine = cls(d.get("cache_mb", 256), d.get("disk_cache", True), d.get("max_voices", 16), d.get("voice_steal", "oldest"),
+                     d.get("stream_seconds", 60), (d.get("quantize_bpm", 0), d.get("quantize_steps", 4)), shared)
+        engine.export_stats(d.get("stats_export", ""), d.get("stats_file"), d.get("stats_interval", 10))
+        return engine
+
+    def set_output(self, name, target="", gain=1.0):
+        with self.lock:
+            out = self.outputs.get(name)
+            if out is None:
+                out = self.outputs[name] = OutputStream(name, target, gain, self.stats)
+                out.seen = target in (self.devices or ())
+            out.gain = gain
+            new = self.switching.get(name)
+            if new is not None and new.target != target:
+                self.switching.pop(name).stop()
+                new = None
+            if new is not None:
+                new.gain = gain
+            elif out.target != target and out.alive():
+                self._switch(out, target)
+            elif out.target != target or not (out.alive() or out.missing):
+                out.target, out.missing = target, False
+                out.seen = target in (self.devices or ())
+                out.start()
+            return out
+
+    def _switch(self, out, target):
+        new = self.switching[out.name] = OutputStream(out.name, target, out.gain, self.stats)
+        new.seen = target in (self.devices or ())
+        new.level = 0.0
+        new.start()
+        threading.Thread(target=self._handover, args=(out, new), daemon=True).start()
+
+    def _handover(self, out, new):
+        deadline = time.monotonic() + 2.0
+        while new.alive() and not new.flowing() and time.monotonic() < deadline:
+            time.sleep(0.002)
+        with self.lock:
+            if self.switching.get(out.name) is not new:
+                return
+            del self.switching[out.name]
+            if not new.alive() or self.outputs.get(out.name) is not out:
+                new.stop()
+                print(f"linuxpad: cannot open output {out.name} on {new.target or 'default'}", file=sys.stderr)
+                return
+            self.outputs[out.name] = new
+            out.handover(new)
+            self.stats.count("switches")
+        time.sleep(CROSSFADE_SECONDS + 0.05)
+        out.stop()
+
+    def set_gain(self, name, gain):
+        for out in (self.outputs.get(name), self.switching.get(name)):
+            if out:
+                out.gain = gain
+
+    def remove_output(self, name):
+        with self.lock:
+            for out in (self.outputs.pop(name, None), self.switching.pop(name, None)):
+                if out:
+                    out.stop()
+
+    def set_devices(self, names):
+        with self.lock:
+            self.devices = set(names)
+            for out in list(self.outputs.values()):
+                if not out.target:
+                    continue
+                if out.target in self.devices:
+                    if out.missing or not out.alive():
+                        out.missing = False
+                        out.start()
+                        self.stats.count("reconnects")
+                    out.seen = True
+                elif out.seen and not out.missing:
+                    out.missing = True
+                    out.stop()
+                    out.clear()
+            return [out.name for out in self.outputs.values() if out.missing]
+
+    def set_outputs(self, outputs):
+        wanted = {o["name"]: o for o in outputs if o.get("enabled", True)}
+        for name in [n for n in self.outputs if n not in wanted]:
+            self.remove_output(name)
+        for name, o in wanted.items():
+            self.set_output(name, o.get("target", ""), o.get("gain", 100) / 100.0)
+
+    def set_clip_gains(self, gains):
+        self.clip_gains = gains
+
+    def set_durations(self, durations):
+        self.durations = durations
+
+    def set_hashes(self, hashes):
+        if self.cache.disk:
+            self.cache.disk.seed(hashes)
+
+    def streams(self, fp):
+        if not self.stream_seconds:
+            return False
+        if fp in self.cache.pinned or fp in self.cache.keys:
+            return False
+        duration = self.durations.get(fp, self.probed.get(fp))
+        if duration is None:
+            if os.path.getsize(fp) >= self.stream_seconds * STREAM_BYTES_PER_SECOND:
+                self.probed[fp] = 0.0
+                threading.Thread(target=self._probe, args=(fp,), daemon=True).start()
+            return False
+        return duration >= self.stream_seconds
+
+    def _probe(self, fp):
+        self.probed[fp] = AudioProbe.probe(fp).get("duration", math.inf)
+
+    def set_quantize(self, bpm, steps=4):
+        self.step = RATE * 60.0 / bpm / max(1, steps) if bpm > 0 else 0.0
+        self.epoch = time.monotonic()
+
+    def play(self, fp, start=0.0, at=None, loop=False):
+        t0 = time.monotonic()
+        pos = int(start * RATE) * FRAME_BYTES
+        try:
+            if self.streams(fp) and not loop:
+                sample = Stream(fp, pos, perf=self.stats)
+            else:
+                sample = self.cache.get(fp)
+        except OSError:
+            self.stats.count("errors")
+            raise
+        items = [(sample, self.clip_gains.get(fp, 1.0))]
+        return self._start(Playback(sample, t0), items, pos, at, loop)
+
+    def sequence(self, paths, at=None, loop=False):
+        t0 = time.monotonic()
+        try:
+            items = [(self.cache.get(fp), self.clip_gains.get(fp, 1.0)) for fp in paths]
+        except OSError:
+            self.stats.count("errors")
+            raise
+        return self._start(Playback(items[0][0], t0), items, 0, at, loop)
+
+    def enqueue(self, fp):
+        pb = next((p for p in reversed(self.active()) if not isinstance(p.sample, Stream)), None)
+        if pb is None:
+            return self.play(fp)
+        item = (self.cache.get(fp), self.clip_gains.get(fp, 1.0))
+        for v in pb.voices:
+            if v.items is None:
+                v.items = [(v.sample, v.gain)]
+            v.items.append(item)
+        if pb.finished():
+            return self.play(fp)
+        return pb
+
+    def _start(self, pb, items, pos, at, loop):
+        with self.lock:
+            self.playing = [p for p in self.playing if not p.finished()]
+            while self.playing and len(self.playing) >= self.max_voices:
+                self._release(self._victim())
+            self.playing.append(pb)
+            chain = len(items) > 1 or loop
+            for out in list(self.outputs.values()):
+                if out.missing:
+                    continue
+                if not out.alive():
+                    out.start()
+                voice = Voice(items[0][0], pb, items[0][1], pos, out.schedule(at, self.step, self.epoch),
+                              list(items) if chain else None, loop)
+                pb.voices.append(voice)
+                out.add(voice)
+        return pb
+
+    def _victim(self):
+        if self.steal == "quietest":
+            return min(self.playing, key=lambda p: p.sample.level())
+        return self.playing[0]
+
+    def _release(self, pb):
+        pb.stopped = True
+        if pb in self.playing:
+            self.playing.remove(pb)
+        for out in list(self.outputs.values()):
+            out.remove(pb)
+        if pb.voices:
+            self.stopped_at[pb.path] = pb.voices[0].pos / (RATE * FRAME_BYTES)
+        if isinstance(pb.sample, Stream):
+            pb.sample.close()
+
+    def position(self, fp):
+        for pb in reversed(self.active()):
+            if pb.path == fp and pb.voices:
+                return pb.voices[0].pos / (RATE * FRAME_BYTES)
+        return None
+
+    def seek(self, fp, seconds):
+        pos = max(0, int(seconds * RATE)) * FRAME_BYTES
+        found = False
+        for pb in self.active():
+            if pb.path != fp:
+                continue
+            if isinstance(pb.sample, Stream):
+                pos = pb.sample.seek(pos)
+            elif pb.sample.view is not None:
+                pos = min(pos, len(pb.sample.view))
+            for v in pb.voices:
+                v.pos = pos
+            found = True
+        return found
+
+    def active(self):
+        with self.lock:
+            self.playing = [p for p in self.playing if not p.finished()]
+            return list(self.playing)
+
+    def is_playing(self, fp):
+        return any(p.path == fp for p in self.active())
+
+    def toggle(self, fp):
+        with self.lock:
+            if self.is_playing(fp):
+                self.stop(fp)
+                return False
+            self.play(fp)
+            return True
+
+    def stop(self, fp=None):
+        with self.lock:
+            for pb in [p for p in self.playing if fp is None or p.path == fp]:
+                self._release(pb)
+        if fp is None:
+            for out in list(self.outputs.values()):
+                out.clear()
+
+    def stats_snapshot(self):
+        return self.stats.snapshot(self.cache.stats(), len(self.active()))
+
+    def export_stats(self, fmt, path=None, interval=10):
+        if fmt not in STATS_FILES:
+            self.exporter = None
+            return
+        self.exporter = (fmt, Path(path).expanduser() if path else CONFIG_DIR / STATS_FILES[fmt], max(1.0, float(interval)))
+        if self.export_thread is None:
+            self.export_thread = threading.Thread(target=self._export, daemon=True)
+            self.export_thread.start()
+
+    def _export(self):
+        while self.exporter and not self.closed.wait(self.exporter[2]):
+            self.write_stats()
+        self.export_thread = None
+
+    def write_stats(self):
+        exporter = self.exporter
+        if not exporter:
+            return
+        fmt, path, _ = exporter
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if fmt == "jsonl":
+                with open(path, "a") as f:
+                    f.write(json.dumps({"time": round(time.time(), 3), **self.stats_snapshot()}) + "\n")
+            else:
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(self.stats.prometheus(self.cache.stats(), len(self.active())))
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"linuxpad: cannot write stats to {path}: {e}", file=sys.stderr)
+
+    def shutdown(self):
+        self.stop()
+        with self.lock:
+            for out in list(self.outputs.values()) + list(self.switching.values()):
+                out.stop()
+            self.switching.clear()
+        self.closed.set()
+        self.write_stats()
+        if self.cache.disk:
+            self.cache.disk.flush()
+
+
+class DeviceMonitor:
+    EVENT_RE = re.compile(r"Event '(\w+)' on ([\w-]+) #(\d+)")
+
+    def __init__(self):
+        self.results = {}
+        self.devices = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.dirty = set()
+        self.running = False
+        self.ready = threading.Event()
+        self.proc = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.dirty = {"sink", "source", "node"}
+        threading.Thread(target=self._worker, daemon=True).start()
+        threading.Thread(target=self._subscribe, daemon=True).start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def refresh(self, kinds=("sink", "source", "node")):
+        with self.cond:
+            self.dirty.update(kinds)
+            self.cond.notify()
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.devices)
+
+    def _worker(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            while True:
+                with self.cond:
+                    while self.running and not self.dirty:
+                        self.cond.wait()
+                    if not self.running:
+                        return
+                time.sleep(0.05)  # let bursts of pactl events settle into one query
+                with self.cond:
+                    kinds, self.dirty = sorted(self.dirty), set()
+                fresh = dict(zip(kinds, pool.map(AudioDeviceManager.query, kinds)))
+                with self.lock:
+                    self.results.update(fresh)
+                    self.devices = AudioDeviceManager.merge(self.results)
+                    devices, listeners = list(self.devices), list(self.listeners)
+                self.ready.set()
+                for cb in listeners:
+                    cb(devices)
+
+    def _subscribe(self):
+        import subprocess
+        try:
+            self.proc = subprocess.Popen(["pactl", "subscribe"], stdin=subprocess.DEVNULL,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError:
+            return
+        for line in self.proc.stdout:
+            if not self.running:
+                break
+            m = self.EVENT_RE.search(line)
+            if not m or m.group(1) not in ("new", "remove"):
+                continue
+            facility = m.group(2)
+            if facility in ("sink", "source"):
+                self.refresh((facility, "node"))
+            elif facility == "client":
+                self.refresh(("node",))
+
+
+class DeviceSignal(QObject):
+    changed = pyqtSignal(list)
+
 class DeviceSelectDialog(QDialog):
-    def __init__(self, parent=None, current_target=""):
+    def __init__(self, parent=None, current_target="", monitor=None):
         super().__init__(parent)
         self.current_target = current_target
+        self.monitor = monitor
+        self.dev_sig = DeviceSignal()
+        self.dev_sig.changed.connect(self.load_devices)
         self.init_ui()
-        self.load_devices()
+        if self.monitor:
+            self.on_devices = self.dev_sig.changed.emit
+            self.monitor.subscribe(self.on_devices)
+            self.finished.connect(lambda _: self.monitor.unsubscribe(self.on_devices))
+            if self.monitor.ready.is_set():
+                self.load_devices(self.monitor.snapshot())
+            else:
+                self.show_loading()
+        else:
+            self.load_devices()
     
     def init_ui(self):
         self.setWindowTitle("Select Audio Target")
@@ -204,7 +2299,7 @@ class DeviceSelectDialog(QDialog):
         info.setStyleSheet("color: #888; margin-bottom: 10px;")
         layout.addWidget(info)
         refresh_btn = QPushButton("Refresh Devices")
-        refresh_btn.clicked.connect(self.load_devices)
+        refresh_btn.clicked.connect(self.refresh_devices)
         layout.addWidget(refresh_btn)
         self.device_list = QListWidget()
         self.device_list.setStyleSheet("""
@@ -235,9 +2330,24 @@ class DeviceSelectDialog(QDialog):
         buttons.rejected.connect(self.reject)
         layout.addWidget(buttons)
     
-    def load_devices(self):
+    def refresh_devices(self):
+        if self.monitor:
+            self.monitor.refresh()
+        else:
+            self.load_devices()
+
+    def show_loading(self):
+        self.device_list.clear()
+        item = QListWidgetItem("Searching for devices...")
+        item.setFlags(Qt.ItemFlag.NoItemFlags)
+        self.device_list.addItem(item)
+
+    def load_devices(self, devices=None):
+        if devices is None:
+            devices = AudioDeviceManager.get_all_targets()
+        current = self.device_list.currentItem()
+        selected = current.data(Qt.ItemDataRole.UserRole) if current else None
         self.device_list.clear()
-        devices = AudioDeviceManager.get_all_targets()
         for dev in devices:
             item = QListWidgetItem()
             item.setText(f"{dev['display']}\n  ID: {dev['id']}")
@@ -249,6 +2359,8 @@ class DeviceSelectDialog(QDialog):
                 font.setBold(True)
                 item.setFont(font)
             self.device_list.addItem(item)
+            if dev['id'] == selected:
+                self.device_list.setCurrentItem(item)
         if not devices:
             item = QListWidgetItem("No devices found")
             item.setFlags(Qt.ItemFlag.NoItemFlags)
@@ -264,23 +2376,774 @@ class DeviceSelectDialog(QDialog):
         return None
 
 
+class OutputsDialog(QDialog):
+    def __init__(self, parent=None, outputs=(), monitor=None):
+        super().__init__(parent)
+        self.outputs = [dict(o) for o in outputs]
+        self.monitor = monitor
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        self.setWindowTitle("Outputs")
+        self.setMinimumSize(500, 360)
+        self.setStyleSheet(DARK_THEME)
+        layout = QVBoxLayout(self)
+        info = QLabel("Every sound is decoded once and played on all checked outputs.\n"
+                      "Add your virtual mic, headphones or a recording sink.")
+        info.setStyleSheet("color: #888; margin-bottom: 10px;")
+        layout.addWidget(info)
+        self.output_list = QListWidget()
+        self.output_list.setStyleSheet("""
+            QListWidget { background: #252525; border: 1px solid #3d3d3d; border-radius: 4px; }
+            QListWidget::item { padding: 10px; border-bottom: 1px solid #3d3d3d; }
+            QListWidget::item:selected { background: #3daee9; }
+        """)
+        self.output_list.itemChanged.connect(self.on_item_changed)
+        self.output_list.itemDoubleClicked.connect(lambda _: self.change_device())
+        layout.addWidget(self.output_list)
+        row = QHBoxLayout()
+        for text, slot in (("Add...", self.add_output), ("Device...", self.change_device),
+                           ("Rename...", self.rename_output), ("Remove", self.remove_output)):
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            row.addWidget(btn)
+        layout.addLayout(row)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def refresh(self):
+        current = self.output_list.currentRow()
+        self.output_list.blockSignals(True)
+        self.output_list.clear()
+        for o in self.outputs:
+            device = AudioDeviceManager._format_display_name(o["target"]) if o["target"] else "Default output"
+            item = QListWidgetItem(f"{o['name']}\n  {device}")
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if o.get("enabled", True) else Qt.CheckState.Unchecked)
+            self.output_list.addItem(item)
+        self.output_list.setCurrentRow(min(current, len(self.outputs) - 1))
+        self.output_list.blockSignals(False)
+
+    def on_item_changed(self, item):
+        self.outputs[self.output_list.row(item)]["enabled"] = item.checkState() == Qt.CheckState.Checked
+
+    def ask_name(self, title, text=""):
+        name, ok = QInputDialog.getText(self, title, "Name:", text=text)
+        name = name.strip()
+        if not ok or not name:
+            return None
+        if any(o["name"].lower() == name.lower() and o["name"] != text for o in self.outputs):
+            QMessageBox.warning(self, title, f"An output named {name} already exists.")
+            return None
+        return name
+
+    def pick_device(self, current=""):
+        dialog = DeviceSelectDialog(self, current, self.monitor)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        return dialog.get_selected_device() or ""
+
+    def add_output(self):
+        name = self.ask_name("Add Output")
+        if name is None:
+            return
+        target = self.pick_device()
+        if target is None:
+            return
+        self.outputs.append({"name": name, "target": target, "gain": 100, "enabled": True})
+        self.refresh()
+        self.output_list.setCurrentRow(len(self.outputs) - 1)
+
+    def change_device(self):
+        row = self.output_list.currentRow()
+        if row < 0:
+            return
+        target = self.pick_device(self.outputs[row]["target"])
+        if target is not None:
+            self.outputs[row]["target"] = target
+            self.refresh()
+
+    def rename_output(self):
+        row = self.output_list.currentRow()
+        if row < 0:
+            return
+        name = self.ask_name("Rename Output", self.outputs[row]["name"])
+        if name:
+            self.outputs[row]["name"] = name
+            self.refresh()
+
+    def remove_output(self):
+        row = self.output_list.currentRow()
+        if row >= 0:
+            del self.outputs[row]
+            self.refresh()
+
+
+class ImportJob:
+    def __init__(self, paths, known_files, known_hashes, on_batch, on_progress, on_done, workers=None):
+        self.paths = list(paths)
+        self.known_files = set(known_files)
+        self.hashes = set(known_hashes)
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.workers = workers or min(8, os.cpu_count() or 2)
+        self.cancelled = False
+        self.found = self.done = self.skipped = self.added = 0
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _scan(self):
+        for path in self.paths:
+            if os.path.isdir(path):
+                stack = [path]
+                while stack and not self.cancelled:
+                    try:
+                        with os.scandir(stack.pop()) as it:
+                            entries = sorted(it, key=lambda e: e.name.lower())
+                    except OSError:
+                        continue
+                    subdirs = []
+                    for e in entries:
+                        if e.is_dir(follow_symlinks=False):
+                            subdirs.append(e.path)
+                        elif Path(e.name).suffix.lower() in AUDIO_EXTS:
+                            yield e.path
+                    stack.extend(reversed(subdirs))
+            elif Path(path).suffix.lower() in AUDIO_EXTS:
+                yield path
+
+    @staticmethod
+    def _probe(fp):
+        try:
+            st = os.stat(fp)
+            digest = DiskCache.content_hash(fp)
+        except OSError:
+            return None
+        return {"file": fp, "name": Path(fp).stem, "hotkey": "", "hash": digest,
+                "mtime": st.st_mtime_ns, "size": st.st_size, **AudioProbe.probe(fp)}
+
+    def _run(self):
+        from concurrent.futures import ThreadPoolExecutor
+        batch, last = [], time.monotonic()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for fp in self._scan():
+                if self.cancelled:
+                    break
+                if fp in self.known_files:
+                    self.skipped += 1
+                    continue
+                self.known_files.add(fp)
+                pending.append(pool.submit(self._probe, fp))
+                self.found += 1
+                while len(pending) > self.workers * 4 or (pending and pending[0].done()):
+                    self._collect(pending.popleft().result(), batch)
+                if batch and (len(batch) >= 500 or time.monotonic() - last > 0.1):
+                    self.on_batch(batch)
+                    batch, last = [], time.monotonic()
+                    self.on_progress(self.done, self.found)
+            for fut in pending:
+                if self.cancelled:
+                    fut.cancel()
+                    continue
+                self._collect(fut.result(), batch)
+                if len(batch) >= 500:
+                    self.on_batch(batch)
+                    batch = []
+                    self.on_progress(self.done, self.found)
+        if batch:
+            self.on_batch(batch)
+        self.on_progress(self.done, self.found)
+        self.on_done(self.added, self.skipped, self.cancelled)
+
+    def _collect(self, entry, batch):
+        self.done += 1
+        if entry is None or entry["hash"] in self.hashes:
+            self.skipped += 1
+            return
+        self.hashes.add(entry["hash"])
+        batch.append(entry)
+        self.added += 1
+
+
+class ImportSignal(QObject):
+    batch = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int, int, bool)
+
+
+class LoudnessJob:
+    def __init__(self, entries, on_batch, on_done, workers=2):
+        self.entries = [(s["file"], s.get("loudness")) for s in entries if s.get("file")]
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.workers = workers
+        self.cancelled = False
+        self.analyzed = 0
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _measure(self, fp):
+        if self.cancelled:
+            return None
+        try:
+            stamp = LoudnessMeter.stamp(fp)
+        except OSError:
+            return None
+        try:
+            proc = AudioDecoder.open(fp)
+        except OSError:
+            return None
+        try:
+            result = LoudnessMeter.measure(LoudnessMeter.chunks(proc.stdout, lambda: self.cancelled))
+        finally:
+            proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        if result is None or proc.returncode not in (0, -signal.SIGKILL) or self.cancelled:
+            return None
+        result["mtime"], result["size"] = stamp
+        return fp, result
+
+    def _run(self):
+        from concurrent.futures import ThreadPoolExecutor
+        stale = [fp for fp, record in self.entries if not LoudnessMeter.fresh(fp, record)]
+        if stale and load_numpy():
+            batch, last = [], time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for item in pool.map(self._measure, stale):
+                    if item:
+                        batch.append(item)
+                        self.analyzed += 1
+                    if batch and (len(batch) >= 100 or time.monotonic() - last > 0.5):
+                        self.on_batch(batch)
+                        batch, last = [], time.monotonic()
+            if batch:
+                self.on_batch(batch)
+        self.on_done(self.analyzed)
+
+
+class LoudnessSignal(QObject):
+    batch = pyqtSignal(list)
+    finished = pyqtSignal(int)
+
+
+class PeakLoader:
+    def __init__(self, cache, on_ready, workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.cache = cache
+        self.on_ready = on_ready
+        self.pool = ThreadPoolExecutor(max_workers=workers or max(2, min(4, (os.cpu_count() or 2) // 2)))
+        self.lock = threading.Lock()
+        self.wanted = set()
+        self.pending = {}
+        self.failed = set()
+        self.closed = False
+
+    def request(self, paths):
+        with self.lock:
+            if self.closed:
+                return
+            self.wanted = {fp for fp in paths if fp not in self.failed}
+            for fp, future in list(self.pending.items()):
+                if fp not in self.wanted and future.cancel():
+                    del self.pending[fp]
+            for fp in paths:
+                if fp in self.wanted and fp not in self.pending:
+                    self.pending[fp] = self.pool.submit(self._load, fp)
+
+    def _load(self, fp):
+        result = None
+        try:
+            key = PeakCache.key(fp)
+            result = self.cache.get(key)
+            if result is None and load_numpy():
+                result = PeakCache.measure(fp, lambda: fp in self.wanted and not self.closed)
+                if result:
+                    self.cache.put(key, *result)
+        except OSError:
+            pass
+        with self.lock:
+            del self.pending[fp]
+            if result:
+                self.on_ready(fp, *result)
+            elif fp in self.wanted and not self.closed:
+                if result is False:
+                    self.pending[fp] = self.pool.submit(self._load, fp)
+                else:
+                    self.failed.add(fp)
+
+    def stop(self):
+        with self.lock:
+            self.closed = True
+            self.wanted = set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PeakSignal(QObject):
+    ready = pyqtSignal(str, float, bytes)
+
+
+class SearchIndex:
+    SPLIT_RE = re.compile(r"[\W_]+")
+
+    def __init__(self, sounds=()):
+        self.dirs = {}
+        self.reset(sounds)
+
+    @classmethod
+    def tokenize(cls, text):
+        import unicodedata
+        text = text or ""
+        if text.isascii():
+            text = text.lower()
+        else:
+            text = unicodedata.normalize("NFKD", text)
+            text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+        return list(filter(None, cls.SPLIT_RE.split(text)))
+
+    def ensure(self, budget=None):
+        if self.built:
+            return True
+        end = len(self.sounds) if budget is None else min(len(self.sounds), self.cursor + budget)
+        for i in range(self.cursor, end):
+            self._index(self.sounds[i])
+        self.cursor = end
+        if end >= len(self.sounds):
+            self.built = True
+            self.sorted_tokens = sorted(self.postings)
+            self.sorted_names = sorted(self.names)
+            self.row_map()
+        return self.built
+
+    def reset(self, sounds):
+        self.sounds = sounds
+        self.built = False
+        self.cursor = 0
+        self.entries = {}
+        self.postings = defaultdict(set)
+        self.names = defaultdict(set)
+        self.hotkeys = defaultdict(set)
+        self.sorted_tokens = None
+        self.sorted_names = None
+        self.prefixes = {}
+        self.rows = None
+
+    def add(self, entries):
+        if not self.built:
+            return
+        for entry in entries:
+            self._index(entry)
+        if self.rows is not None:
+            for entry in entries:
+                self.rows[id(entry)] = len(self.rows)
+
+    def update(self, entry):
+        if id(entry) in self.entries:
+            self._unindex(id(entry))
+            self._index(entry)
+
+    def remove(self, entry, row):
+        self._unindex(id(entry))
+        if row < self.cursor:
+            self.cursor -= 1
+        self.rows = None
+
+    def _dir_tokens(self, parent):
+        toks = self.dirs.get(parent)
+        if toks is None:
+            toks = self.dirs[parent] = frozenset(self.tokenize(" ".join(parent.rsplit("/", 3)[-3:])))
+        return toks
+
+    def _index(self, entry):
+        fp = entry.get("file", "")
+        parent, _, base = fp.rpartition("/")
+        stem = base.rpartition(".")[0] or base
+        name = tuple(self.tokenize(entry.get("name", "")))
+        other = set(name if entry.get("name") == stem else self.tokenize(stem))
+        other |= self._dir_tokens(parent)
+        hotkey = entry.get("hotkey", "")
+        if hotkey:
+            other.update(self.tokenize(hotkey))
+        eid = id(entry)
+        self.entries[eid] = (name, tuple(other.difference(name)), hotkey)
+        if hotkey:
+            self.hotkeys[hotkey].add(eid)
+        self._post(self.postings, other.union(name), eid)
+        self._post(self.names, name, eid)
+        if self.prefixes:
+            self.prefixes.clear()
+
+    def _post(self, postings, tokens, eid):
+        n = len(postings)
+        for tok in tokens:
+            postings[tok].add(eid)
+        if len(postings) != n:
+            self.sorted_tokens = self.sorted_names = None
+
+    def _unpost(self, postings, tokens, eid):
+        for tok in tokens:
+            ids = postings.get(tok)
+            if ids is not None:
+                ids.discard(eid)
+                if not ids:
+                    del postings[tok]
+                    self.sorted_tokens = self.sorted_names = None
+
+    def _unindex(self, eid):
+        item = self.entries.pop(eid, None)
+        if item is None:
+            return
+        name, other, hotkey = item
+        self._unpost(self.postings, set(name) | set(other), eid)
+        self._unpost(self.names, set(name), eid)
+        self._unpost(self.hotkeys, [hotkey], eid)
+        self.prefixes.clear()
+
+    def _matching(self, term, names=False):
+        key = (term, names)
+        if key in self.prefixes:
+            return self.prefixes[key]
+        postings = self.names if names else self.postings
+        if names:
+            if self.sorted_names is None:
+                self.sorted_names = sorted(self.names)
+            tokens = self.sorted_names
+        else:
+            if self.sorted_tokens is None:
+                self.sorted_tokens = sorted(self.postings)
+            tokens = self.sorted_tokens
+        i = bisect.bisect_left(tokens, term)
+        j = bisect.bisect_left(tokens, term + "\U0010ffff", i)
+        if j - i == 1:
+            found = postings[tokens[i]]
+        else:
+            found = set()
+            for tok in tokens[i:j]:
+                ids = postings[tok]
+                if len(ids) == len(self.entries):
+                    found = ids
+                    break
+                found.update(ids)
+        if len(term) <= 2:
+            self.prefixes[key] = found
+        return found
+
+    def _ids(self, terms, names=False):
+        found = None
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self._matching(term, names)
+            found = ids if found is None else found & ids
+            if not found:
+                break
+        return found or set()
+
+    def row_map(self):
+        if self.rows is None:
+            self.rows = {id(s): i for i, s in enumerate(self.sounds)}
+        return self.rows
+
+    def search(self, query):
+        terms = self.tokenize(query)
+        if not terms:
+            return None
+        self.ensure()
+        ids = self._ids(terms)
+        if len(ids) == len(self.entries):
+            return None
+        rows = self.row_map()
+        return sorted(map(rows.__getitem__, ids))
+
+    def top(self, query):
+        terms = self.tokenize(query)
+        if not terms:
+            return None
+        self.ensure()
+        rows = self.row_map()
+        ids = self.hotkeys.get(query.strip().upper())
+        if ids:
+            return min(map(rows.__getitem__, ids))
+        ids = self._ids(terms, names=True)
+        if not ids:
+            ids = self._ids(terms)
+            return min(map(rows.__getitem__, ids)) if ids else None
+        best = None
+        for eid in ids:
+            name = self.entries[eid][0]
+            score = sum(3 if term in name else 2 for term in terms)
+            key = (-score, len(name), rows[eid])
+            if best is None or key < best:
+                best = key
+        return best[2]
+
+
+class WaveformDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None, cache_size=512):
+        super().__init__(parent)
+        self.pen = QPen(QColor("#3daee9"))
+        self.pixmaps = OrderedDict()
+        self.cache_size = cache_size
+
+    def render(self, peaks, size):
+        pixmap = QPixmap(size)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        mid, half = size.height() / 2, size.height() / 256
+        step = size.width() / PEAK_BINS
+        values = memoryview(peaks).cast("b")
+        painter = QPainter(pixmap)
+        painter.setPen(self.pen)
+        painter.drawLines([QLineF(i * step, mid - values[2 * i + 1] * half, i * step, mid - values[2 * i] * half)
+                           for i in range(PEAK_BINS)])
+        painter.end()
+        return pixmap
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        peaks = index.data(Qt.ItemDataRole.UserRole)
+        if not peaks:
+            return
+        rect = option.rect.adjusted(4, 5, -4, -5)
+        key = (peaks, rect.width(), rect.height())
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = self.pixmaps[key] = self.render(peaks, rect.size())
+            if len(self.pixmaps) > self.cache_size:
+                self.pixmaps.popitem(last=False)
+        else:
+            self.pixmaps.move_to_end(key)
+        painter.drawPixmap(rect.topLeft(), pixmap)
+
+
+class SoundTableModel(QAbstractTableModel):
+    HEADERS = ["#", "Hotkey", "Name", "Duration", "Waveform", "File Path"]
+
+    def __init__(self, sounds, parent=None):
+        super().__init__(parent)
+        self.sounds = sounds
+        self.visible = None
+        self.peaks = {}
+        self.hotkey_brush = QBrush(QColor("#e94560"))
+        self.hotkey_font = QFont("Segoe UI", 13, QFont.Weight.Bold)
+        self.path_brush = QBrush(QColor("#666666"))
+        self.center = int(Qt.AlignmentFlag.AlignCenter)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.sounds) if self.visible is None else len(self.visible)
+
+    def source(self, row):
+        if self.visible is None:
+            return row if 0 <= row < len(self.sounds) else -1
+        return self.visible[row] if 0 <= row < len(self.visible) else -1
+
+    def view_row(self, src):
+        if self.visible is None:
+            return src
+        i = bisect.bisect_left(self.visible, src)
+        return i if i < len(self.visible) and self.visible[i] == src else -1
+
+    def set_filter(self, rows):
+        self.beginResetModel()
+        self.visible = rows
+        self.endResetModel()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row, col = self.source(index.row()), index.column()
+        if row < 0:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            s = self.sounds[row]
+            if col == 0: return str(row + 1)
+            if col == 1: return s.get("hotkey", "")
+            if col == 2: return s.get("name", "Unknown")
+            if col == 3:
+                d = s.get("duration", self.peaks.get(s.get("file"), (None,))[0])
+                return "" if d is None else f"{int(d // 60)}:{d % 60:04.1f}"
+            if col == 4: return None
+            return str(s.get("file", ""))
+        if role == Qt.ItemDataRole.UserRole and col == 4:
+            return self.peaks.get(self.sounds[row].get("file"), (None, None))[1]
+        if role == Qt.ItemDataRole.TextAlignmentRole and col in (0, 1, 3):
+            return self.center
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if col == 1: return self.hotkey_brush
+            if col == 5: return self.path_brush
+        if role == Qt.ItemDataRole.FontRole and col == 1 and self.sounds[row].get("hotkey"):
+            return self.hotkey_font
+        return None
+
+    def reset(self, sounds, rows=None):
+        self.beginResetModel()
+        self.sounds = sounds
+        self.visible = rows
+        self.endResetModel()
+
+    def row_changed(self, src):
+        row = self.view_row(src)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def append(self, entries):
+        if not entries:
+            return
+        if self.visible is not None:
+            self.sounds.extend(entries)
+            return
+        first = len(self.sounds)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self.sounds.extend(entries)
+        self.endInsertRows()
+
+    def remove(self, src):
+        row = self.view_row(src)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        entry = self.sounds.pop(src)
+        if self.visible is not None:
+            self.visible = [r - (r > src) for r in self.visible if r != src]
+        if row >= 0:
+            self.endRemoveRows()
+        last = self.rowCount() - 1
+        if 0 <= row <= last:
+            self.dataChanged.emit(self.index(row, 0), self.index(last, 0))
+        return entry
+
+
 class SoundpadWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.sounds = []
-        self.proc_mic = None
-        self.proc_local = None
+        self.procs = []
         self.current_playing_path = None
-        self.target = ""
-        self.vol_mic = 100
-        self.vol_local = 50
+        self.outputs = []
+        self.playback_mode = "engine"
+        self.cache_mb = 256
+        self.disk_cache = True
+        self.max_voices = 16
+        self.voice_steal = "oldest"
+        self.library_format = "json"
+        self.store = ConfigStore()
+        self.pending_ops = []
+        self.library = None
+        self.categories = [dict(Library.DEFAULT)]
+        self.category = Library.DEFAULT["id"]
+        self.hotkeys_other = []
+        self.import_category = None
+        self.config_extra = {}
+        self.import_warm_cache = False
+        self.normalize = True
+        self.target_lufs = -16.0
+        self.stream_seconds = 60
+        self.audio_worker = True
+        self.show_stats = False
+        self.attached = False
+        self.loudness_job = None
+        self.loudness_rerun = False
+        self.loudness_sig = LoudnessSignal()
+        self.loudness_sig.batch.connect(self.on_loudness_batch)
+        self.loudness_sig.finished.connect(self.on_loudness_finished)
+        self.peak_cache = PeakCache()
+        self.peak_loader = None
+        self.peak_rows = {}
+        self.peak_sig = PeakSignal()
+        self.peak_sig.ready.connect(self.on_peaks)
+        self.import_job = None
+        self.import_queue = []
+        self.import_sig = ImportSignal()
+        self.import_sig.batch.connect(self.on_import_batch)
+        self.import_sig.progress.connect(self.on_import_progress)
+        self.import_sig.finished.connect(self.on_import_finished)
+        self.engine = None
+        self.devices = DeviceMonitor()
+        self.missing_outputs = []
+        self.dev_sig = DeviceSignal()
+        self.dev_sig.changed.connect(self.on_devices)
+        self.devices.subscribe(self.dev_sig.changed.emit)
         self.hk_sig = HotkeySignal()
         self.hk_sig.triggered.connect(self.play_file_toggle)
-        self.ghk = GlobalHotkeyListener(lambda fp: self.hk_sig.triggered.emit(fp))
+        self.hk_sig.status.connect(self.lbl_status_set)
+        self.ghk = GlobalHotkeyListener(self.on_hotkey)
+        self.started = False
+        self.painted = False
+        self.profile_startup = False
         self.init_ui()
+        startup_mark("build ui")
         self.load_config()
-        self.refresh_table()
-        self.ghk.start()
+        startup_mark("load config")
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        if not self.started:
+            startup_mark("show window")
+            QTimer.singleShot(500, self.finish_startup)
+
+    def paintEvent(self, e):
+        super().paintEvent(e)
+        if not self.painted:
+            self.painted = True
+            startup_mark("first paint")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        if self.started:
+            return
+        self.started = True
+        self.model.reset(self.sounds)
+        self.search_index.reset(self.sounds)
+        self.update_count()
+        startup_mark("fill table")
+        self.init_engine()
+        self.sync_engine()
+        startup_mark("start engine")
+        self.setup_global_hotkeys()
+        if not self.attached:
+            self.ghk.start()
+        startup_mark("start hotkeys")
+        self.devices.start()
+        startup_mark("start devices")
+        self.update_cache_label()
+        self.analyze_loudness()
+        self.build_index()
+        self.peak_loader = PeakLoader(self.peak_cache, self.peak_sig.ready.emit)
+        self.request_peaks()
+        if self.profile_startup:
+            print(startup_report(), file=sys.stderr)
+
+    def init_engine(self):
+        if self.playback_mode != "engine":
+            return
+        client = ControlClient.connect(SOCKET_PATH)
+        if client:
+            self.engine = RemoteEngine(client)
+            self.attached = True
+            self.setWindowTitle("LinuxPad (daemon)")
+        elif PlaybackEngine.available():
+            self.engine = AudioWorker(self.settings()) if self.audio_worker else PlaybackEngine.from_settings(self.settings())
+        if self.engine:
+            self.engine.set_outputs(self.outputs)
 
     def init_ui(self):
         self.setWindowTitle("LinuxPad")
@@ -300,73 +3163,86 @@ class SoundpadWindow(QMainWindow):
         add_act = QAction(style.standardIcon(QStyle.StandardPixmap.SP_FileDialogNewFolder), "Add", self)
         add_act.triggered.connect(self.add_files)
         toolbar.addAction(add_act)
+        import_act = QAction(style.standardIcon(QStyle.StandardPixmap.SP_DirOpenIcon), "Import Folder", self)
+        import_act.triggered.connect(self.import_folder)
+        toolbar.addAction(import_act)
+        self.stats_act = QAction(style.standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView), "Stats", self)
+        self.stats_act.setCheckable(True)
+        self.stats_act.toggled.connect(self.toggle_stats)
+        toolbar.addAction(self.stats_act)
         toolbar.addSeparator()
-        lbl_target = QLabel(" Target: ")
+        lbl_target = QLabel(" Outputs: ")
         lbl_target.setStyleSheet("color: #aaa;")
         toolbar.addWidget(lbl_target)
-        self.btn_target = QPushButton("Select Device...")
-        self.btn_target.setStyleSheet("""
+        self.btn_outputs = QPushButton("Add Output...")
+        self.btn_outputs.setStyleSheet("""
             QPushButton { background: #252525; border: 1px solid #3d3d3d; color: #3daee9; border-radius: 4px; padding: 5px 15px; font-weight: bold; }
             QPushButton:hover { border: 1px solid #5294e2; background: #353535; }
         """)
-        self.btn_target.clicked.connect(self.change_target)
-        toolbar.addWidget(self.btn_target)
+        self.btn_outputs.clicked.connect(self.edit_outputs)
+        toolbar.addWidget(self.btn_outputs)
         dummy = QWidget()
         dummy.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         toolbar.addWidget(dummy)
-        lbl_mic = QLabel(" Mic: ")
-        lbl_mic.setStyleSheet("color: #e94560; font-weight: bold;")
-        toolbar.addWidget(lbl_mic)
-        self.slider_mic = QSlider(Qt.Orientation.Horizontal)
-        self.slider_mic.setRange(0, 100)
-        self.slider_mic.setValue(100)
-        self.slider_mic.setFixedWidth(80)
-        self.slider_mic.valueChanged.connect(lambda v: self.lbl_mic_val.setText(f"{v}%"))
-        self.slider_mic.valueChanged.connect(lambda v: setattr(self, 'vol_mic', v))
-        toolbar.addWidget(self.slider_mic)
-        self.lbl_mic_val = QLabel("100% ")
-        self.lbl_mic_val.setFixedWidth(35)
-        toolbar.addWidget(self.lbl_mic_val)
-        lbl_local = QLabel(" Local: ")
-        lbl_local.setStyleSheet("color: #3daee9; font-weight: bold;")
-        toolbar.addWidget(lbl_local)
-        self.slider_local = QSlider(Qt.Orientation.Horizontal)
-        self.slider_local.setRange(0, 100)
-        self.slider_local.setValue(50)
-        self.slider_local.setFixedWidth(80)
-        self.slider_local.valueChanged.connect(lambda v: self.lbl_local_val.setText(f"{v}%"))
-        self.slider_local.valueChanged.connect(lambda v: setattr(self, 'vol_local', v))
-        toolbar.addWidget(self.slider_local)
-        self.lbl_local_val = QLabel("50% ")
-        self.lbl_local_val.setFixedWidth(35)
-        toolbar.addWidget(self.lbl_local_val)
+        self.output_strip = QWidget()
+        self.output_layout = QHBoxLayout(self.output_strip)
+        self.output_layout.setContentsMargins(0, 0, 0, 0)
+        toolbar.addWidget(self.output_strip)
         splitter = QSplitter(Qt.Orientation.Horizontal)
         self.sidebar = QListWidget()
         self.sidebar.setFixedWidth(200)
-        item = QListWidgetItem("My Sounds")
-        item.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_DirHomeIcon))
-        self.sidebar.addItem(item)
-        self.sidebar.setCurrentRow(0)
+        self.sidebar.currentItemChanged.connect(self.on_category_selected)
+        self.sidebar.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.sidebar.customContextMenuRequested.connect(self.sidebar_context_menu)
         splitter.addWidget(self.sidebar)
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["#", "Hotkey", "Name", "File Path"])
+        self.model = SoundTableModel(self.sounds, self)
+        self.search_index = SearchIndex(self.sounds)
+        self.filter_box = QLineEdit()
+        self.filter_box.setPlaceholderText("Search sounds... (Ctrl+F, Enter plays top match)")
+        self.filter_box.setClearButtonEnabled(True)
+        self.filter_box.textChanged.connect(self.apply_filter)
+        self.filter_box.returnPressed.connect(self.play_top_match)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(30)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setAlternatingRowColors(True)
         self.table.setShowGrid(False)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-        self.table.cellDoubleClicked.connect(self.play_selected)
+        self.table.doubleClicked.connect(self.play_selected)
         header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)
+        header.resizeSection(0, 60)
+        header.resizeSection(1, 90)
+        header.resizeSection(3, 70)
+        header.resizeSection(4, 2 * PEAK_BINS + 8)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
+        self.waveform_delegate = WaveformDelegate(self.table)
+        self.table.setItemDelegateForColumn(4, self.waveform_delegate)
+        self.peak_timer = QTimer(self)
+        self.peak_timer.setSingleShot(True)
+        self.peak_timer.setInterval(30)
+        self.peak_timer.timeout.connect(self.request_peaks)
+        self.table.verticalScrollBar().valueChanged.connect(self.schedule_peaks)
+        self.model.modelReset.connect(self.schedule_peaks)
+        self.model.rowsInserted.connect(self.schedule_peaks)
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.table_context_menu)
-        splitter.addWidget(self.table)
+        library = QWidget()
+        library_layout = QVBoxLayout(library)
+        library_layout.setContentsMargins(0, 0, 0, 0)
+        library_layout.setSpacing(0)
+        library_layout.addWidget(self.filter_box)
+        library_layout.addWidget(self.table)
+        splitter.addWidget(library)
         splitter.setStretchFactor(1, 1)
         self.setAcceptDrops(True)
         self.table.setAcceptDrops(False)
@@ -378,199 +3254,1397 @@ class SoundpadWindow(QMainWindow):
         self.lbl_status = QLabel("Ready")
         self.lbl_status.setObjectName("StatusLabel")
         sb_layout.addWidget(self.lbl_status)
+        self.import_bar = QProgressBar()
+        self.import_bar.setFixedWidth(200)
+        self.import_bar.setMaximumHeight(16)
+        self.import_bar.hide()
+        sb_layout.addWidget(self.import_bar)
+        self.btn_import_cancel = QPushButton("Cancel")
+        self.btn_import_cancel.clicked.connect(self.cancel_import)
+        self.btn_import_cancel.hide()
+        sb_layout.addWidget(self.btn_import_cancel)
+        sb_layout.addStretch()
+        self.lbl_cache = QLabel("")
+        self.lbl_cache.setObjectName("StatusLabel")
+        sb_layout.addWidget(self.lbl_cache)
+        self.stats_panel = QLabel("")
+        self.stats_panel.setObjectName("StatsPanel")
+        self.stats_panel.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.stats_panel.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_cache_label)
+        self.stats_timer.start(1000)
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(500)
+        self.save_timer.timeout.connect(self.flush_config)
         main_widget = QWidget()
         main_layout = QVBoxLayout(main_widget)
         main_layout.setContentsMargins(0,0,0,0)
         main_layout.setSpacing(0)
         main_layout.addWidget(splitter)
+        main_layout.addWidget(self.stats_panel)
         main_layout.addWidget(self.status_bar)
         self.setCentralWidget(main_widget)
         QShortcut(QKeySequence("Escape"), self).activated.connect(self.stop_sound)
         QShortcut(QKeySequence("Delete"), self).activated.connect(self.remove_selected)
+        QShortcut(QKeySequence("Ctrl+F"), self).activated.connect(self.focus_filter)
 
-    def update_target_button(self):
-        if self.target:
-            display = AudioDeviceManager._format_display_name(self.target)
-            if len(display) > 25: display = display[:22] + "..."
-            self.btn_target.setText(display)
-            self.btn_target.setToolTip(f"Target: {self.target}")
-        else:
-            self.btn_target.setText("Select Device...")
+    def set_volume(self, name, v):
+        output = find_output(self.outputs, name)
+        if output is None:
+            return
+        output["gain"] = v
+        if self.engine:
+            self.engine.set_gain(name, v / 100.0)
+        self.save_config()
+
+    def set_output_enabled(self, name, on):
+        output = find_output(self.outputs, name)
+        if output is None:
+            return
+        output["enabled"] = on
+        if self.engine:
+            self.engine.set_outputs(self.outputs)
+        self.update_outputs()
+        self.save_config()
+
+    def enabled_outputs(self):
+        return [o for o in self.outputs if o.get("enabled", True)]
+
+    def update_outputs(self):
+        names = ", ".join(o["name"] for o in self.enabled_outputs())
+        if len(names) > 25: names = names[:22] + "..."
+        self.btn_outputs.setText(names or "Add Output...")
+        self.btn_outputs.setToolTip("\n".join(f"{o['name']}: {o['target'] or 'default output'}"
+                                              f"{'' if o.get('enabled', True) else ' (off)'}" for o in self.outputs))
+
+    def on_devices(self, devices):
+        if not self.engine or self.attached:
+            return
+        try:
+            missing = self.engine.set_devices([d["name"] for d in devices])
+        except OSError:
+            return
+        gone = [n for n in missing if n not in self.missing_outputs]
+        back = [n for n in self.missing_outputs if n not in missing]
+        if gone or back:
+            self.missing_outputs = missing
+            self.lbl_status.setText(f"Output disconnected: {', '.join(gone)}" if gone else f"Output reconnected: {', '.join(back)}")
+            self.rebuild_output_strip()
+
+    def rebuild_output_strip(self):
+        while self.output_layout.count():
+            self.output_layout.takeAt(0).widget().deleteLater()
+        colors = ["#e94560", "#3daee9", "#8bc34a", "#f0a030"]
+        for i, o in enumerate(self.outputs):
+            name = o["name"]
+            check = QCheckBox(f" {name} (offline): " if name in self.missing_outputs else f" {name}: ")
+            if name in self.missing_outputs:
+                check.setToolTip(f"Waiting for {o['target']} to come back")
+            check.setChecked(o.get("enabled", True))
+            check.setStyleSheet(f"color: {colors[i % len(colors)]}; font-weight: bold;")
+            check.toggled.connect(lambda on, n=name: self.set_output_enabled(n, on))
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(0, 100)
+            slider.setValue(o.get("gain", 100))
+            slider.setFixedWidth(80)
+            value = QLabel(f"{o.get('gain', 100)}%")
+            value.setFixedWidth(35)
+            slider.valueChanged.connect(lambda v, lbl=value: lbl.setText(f"{v}%"))
+            slider.valueChanged.connect(lambda v, n=name: self.set_volume(n, v))
+            for widget in (check, slider, value):
+                self.output_layout.addWidget(widget)
+
+    def update_cache_label(self):
+        if not self.engine:
+            return
+        try:
+            st = self.engine.cache.stats()
+        except OSError as e:
+            self.lbl_cache.setText("Daemon disconnected" if self.attached else f"Audio engine: {e}")
+            return
+        self.lbl_cache.setText(f"Cache: {st['used'] / 1048576:.1f}/{st['budget'] / 1048576:.0f} MB  "
+                               f"mapped {st['mapped'] / 1048576:.1f} MB  hits {st['hits']}  misses {st['misses']}")
+        if self.show_stats:
+            self.update_stats_panel()
+
+    def toggle_stats(self, on):
+        if on != self.show_stats:
+            self.show_stats = on
+            self.save_config()
+        self.stats_panel.setVisible(on)
+        if on:
+            self.update_stats_panel()
+
+    def update_stats_panel(self):
+        if not self.engine:
+            self.stats_panel.setText("Playback stats need the built-in engine (playback_mode: engine)")
+            return
+        try:
+            st = self.engine.stats_snapshot()
+        except OSError as e:
+            self.stats_panel.setText("Daemon disconnected" if self.attached else f"Audio engine: {e}")
+            return
+        fmt = lambda h, unit: (f"p50 {h['p50']:.1f}  p95 {h['p95']:.1f}  max {h['max']:.1f} {unit} ({h['n']})"
+                               if h["n"] else "-")
+        rate = st["cache_hit_rate"]
+        self.stats_panel.setText(
+            f"Trigger   {fmt(st['trigger_ms'], 'ms')}\n"
+            f"Decode    {fmt(st['decode_ms'], 'ms')}\n"
+            f"Mixer CPU {fmt(st['mix_cpu_us'], 'us')} per {st['period_us'] / 1000:.1f} ms period\n"
+            f"Voices {st['voices']}   Cache hit rate {'-' if rate is None else f'{rate:.0%}'}   "
+            f"Underruns {st['underruns']}   Xruns {st['xruns']}   Errors {st['errors']}\n"
+            f"Outputs   connect {fmt(st['connect_ms'], 'ms')}   switches {st['switches']}   reconnects {st['reconnects']}"
+            + (f"   Worker restarts {st['worker_restarts']}" if st.get("worker_restarts") else ""))
 
     def refresh_table(self):
-        self.table.setRowCount(0)
-        for i, s in enumerate(self.sounds):
-            self.table.insertRow(i)
-            idx_item = QTableWidgetItem(str(i + 1))
-            idx_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(i, 0, idx_item)
-            hk = s.get("hotkey", "")
-            hk_item = QTableWidgetItem(hk)
-            if hk:
-                hk_item.setForeground(QBrush(QColor("#e94560")))
-                hk_item.setFont(QFont("Segoe UI", 13, QFont.Weight.Bold))
-            hk_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(i, 1, hk_item)
-            self.table.setItem(i, 2, QTableWidgetItem(s.get("name", "Unknown")))
-            path_item = QTableWidgetItem(str(s.get("file", "")))
-            path_item.setForeground(QBrush(QColor("#666666")))
-            self.table.setItem(i, 3, path_item)
-        self.lbl_status.setText(f"Total sounds: {len(self.sounds)}")
+        self.search_index.reset(self.sounds)
+        self.model.reset(self.sounds, self.search_index.search(self.filter_box.text()))
+        self.update_count()
         self.setup_global_hotkeys()
 
+    def update_count(self):
+        if self.model.visible is None:
+            self.lbl_status.setText(f"Total sounds: {len(self.sounds)}")
+        else:
+            self.lbl_status.setText(f"Showing {len(self.model.visible)} of {len(self.sounds)} sounds")
+
+    def build_index(self):
+        if not self.search_index.ensure(2000):
+            QTimer.singleShot(0, self.build_index)
+
+    def focus_filter(self):
+        self.filter_box.setFocus()
+        self.filter_box.selectAll()
+        self.search_index.ensure()
+
+    def apply_filter(self, text=None):
+        rows = self.search_index.search(self.filter_box.text() if text is None else text)
+        self.model.set_filter(rows)
+        if self.model.rowCount():
+            self.table.selectRow(0)
+        self.update_count()
+
+    def play_top_match(self):
+        row = self.search_index.top(self.filter_box.text())
+        if row is None:
+            self.lbl_status.setText(f"No match: {self.filter_box.text()}")
+            return
+        view_row = self.model.view_row(row)
+        if view_row >= 0:
+            self.table.selectRow(view_row)
+        self.play_file(self.sounds[row]["file"])
+
+    def current_row(self):
+        return self.model.source(self.table.currentIndex().row())
+
+    def sounds_changed(self, entry=None):
+        if entry is not None:
+            self.search_index.update(entry)
+        if self.model.visible is not None:
+            self.apply_filter()
+
+    def append_sounds(self, entries):
+        if not entries:
+            return
+        self.model.append(entries)
+        self.search_index.add(entries)
+        self.sounds_changed()
+        self.update_count()
+        self.save_config(("add", [dict(e) for e in entries]))
+
     def add_files(self):
-        files, _ = QFileDialog.getOpenFileNames(self, "Select Audio", "", "Audio (*.mp3 *.wav *.ogg *.flac *.m4a *.opus *.aac)")
+        patterns = " ".join(f"*{ext}" for ext in sorted(AUDIO_EXTS))
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Audio", "", f"Audio ({patterns})")
         if files:
-            for f in files:
-                self.sounds.append({"file": f, "name": Path(f).stem, "hotkey": ""})
-            self.save_config()
-            self.refresh_table()
+            self.import_paths(files)
+
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Import Folder")
+        if folder:
+            self.import_paths([folder])
+
+    def import_paths(self, paths):
+        if self.import_job:
+            self.import_queue.extend(paths)
+            return
+        sig = self.import_sig
+        self.import_category = self.category
+        self.import_job = ImportJob(paths, (s.get("file") for s in self.sounds),
+                                    (s["hash"] for s in self.sounds if s.get("hash")),
+                                    sig.batch.emit, sig.progress.emit, sig.finished.emit).start()
+        self.import_bar.setRange(0, 0)
+        self.import_bar.show()
+        self.btn_import_cancel.show()
+        self.lbl_status.setText("Importing...")
+
+    def cancel_import(self):
+        self.import_queue.clear()
+        if self.import_job:
+            self.import_job.cancel()
+
+    def on_import_batch(self, entries):
+        if self.import_category != self.category:
+            category = self.find_category(self.import_category)
+            if category:
+                self.library.append(category, entries)
+            return
+        self.append_sounds(entries)
+        if self.engine and self.import_warm_cache:
+            self.engine.cache.warm([e["file"] for e in entries])
+
+    def on_import_progress(self, done, found):
+        self.import_bar.setRange(0, max(found, 1))
+        self.import_bar.setValue(done)
+        self.lbl_status.setText(f"Importing... {done}/{found}")
+
+    def on_import_finished(self, added, skipped, cancelled):
+        self.import_job = None
+        if added:
+            self.sync_engine()
+        if self.import_queue:
+            paths, self.import_queue = self.import_queue, []
+            self.import_paths(paths)
+            return
+        self.import_bar.hide()
+        self.btn_import_cancel.hide()
+        state = "Import cancelled" if cancelled else "Imported"
+        self.lbl_status.setText(f"{state}: {added} added, {skipped} skipped. Total sounds: {len(self.sounds)}")
+        if added:
+            self.analyze_loudness()
+
+    def analyze_loudness(self):
+        if self.loudness_job:
+            self.loudness_rerun = True
+            return
+        sig = self.loudness_sig
+        self.loudness_job = LoudnessJob(self.sounds, sig.batch.emit, sig.finished.emit).start()
+
+    def on_loudness_batch(self, results):
+        rows = {s.get("file"): i for i, s in enumerate(self.sounds)}
+        for fp, record in results:
+            row = rows.get(fp)
+            if row is not None:
+                self.sounds[row]["loudness"] = record
+                self.save_config(("set", row, dict(self.sounds[row])))
+        self.sync_engine()
+
+    def on_loudness_finished(self, analyzed):
+        self.loudness_job = None
+        if self.loudness_rerun:
+            self.loudness_rerun = False
+            self.analyze_loudness()
+        elif analyzed:
+            self.lbl_status.setText(f"Loudness analyzed: {analyzed} sounds. Total sounds: {len(self.sounds)}")
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.schedule_peaks()
+
+    def schedule_peaks(self, *_):
+        if self.peak_loader:
+            self.peak_timer.start()
+
+    def request_peaks(self):
+        if not self.peak_loader:
+            return
+        first = self.table.rowAt(0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = self.model.rowCount() - 1
+        rows = {}
+        if first >= 0:
+            for view_row in range(first, last + 1):
+                row = self.model.source(view_row)
+                fp = self.sounds[row].get("file") if row >= 0 else None
+                if fp and fp not in self.model.peaks:
+                    rows[fp] = row
+        self.peak_rows = rows
+        self.peak_loader.request(list(rows))
+
+    def on_peaks(self, fp, duration, peaks):
+        self.model.peaks[fp] = (duration, peaks)
+        row = self.peak_rows.get(fp)
+        if row is None or row >= len(self.sounds) or self.sounds[row].get("file") != fp:
+            return
+        if "duration" not in self.sounds[row]:
+            self.sounds[row]["duration"] = round(duration, 3)
+            self.save_config(("set", row, dict(self.sounds[row])))
+        self.model.row_changed(row)
+
+    def sync_engine(self):
+        if self.engine:
+            entries = self.hotkeys_other + self.sounds
+            self.engine.set_clip_gains(clip_gains(entries, self.target_lufs) if self.normalize else {})
+            self.engine.set_durations({s["file"]: s["duration"] for s in entries if s.get("file") and "duration" in s})
+            self.engine.set_hashes(file_hashes(entries))
 
     def play_selected(self):
-        row = self.table.currentRow()
-        if 0 <= row < len(self.sounds):
+        row = self.current_row()
+        if row >= 0:
             self.play_file(self.sounds[row]["file"])
 
     def play_file_toggle(self, fp):
-        if self.current_playing_path == fp:
+        if self.engine:
+            if self.engine.is_playing(fp):
+                self.engine.stop(fp)
+                self.lbl_status.setText(f"Stopped: {Path(fp).name}")
+                return
+        elif self.current_playing_path == fp:
             self.stop_sound()
             return
         self.play_file(fp)
 
-    def play_file(self, fp):
+    def play_file(self, fp, start=0.0, loop=False):
+        import subprocess
         if not fp or not os.path.exists(fp): 
             self.lbl_status.setText(f"File not found: {fp}")
             return
-        if not self.target:
-            self.lbl_status.setText("No target device selected!")
+        outputs = self.enabled_outputs()
+        if not outputs:
+            self.lbl_status.setText("No output enabled!")
+            return
+        if self.engine:
+            try:
+                self.engine.set_outputs(self.outputs)
+                self.engine.play(fp, start, loop=loop)
+                self.current_playing_path = fp
+                self.lbl_status.setText(f"{'Looping' if loop else 'Playing'}: {Path(fp).name} ({len(self.engine.active())} voices)")
+            except OSError as e:
+                self.lbl_status.setText(f"Error: {e}")
             return
         self.stop_sound()
+        entry = next((s for s in self.sounds if s.get("file") == fp), {})
+        gain = clip_gain(entry, self.target_lufs) if self.normalize else 1.0
         try:
-            mic_vol_float = self.vol_mic / 100.0
-            self.proc_mic = subprocess.Popen(
-                ["pw-play", "--target", self.target, "--volume", str(mic_vol_float), fp],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-            )
-            if self.vol_local > 0:
-                local_vol_float = self.vol_local / 100.0
-                self.proc_local = subprocess.Popen(
-                    ["pw-play", "--volume", str(local_vol_float), fp],
+            for o in outputs:
+                if o.get("gain", 100) <= 0:
+                    continue
+                target = ["--target", o["target"]] if o["target"] else []
+                self.procs.append(subprocess.Popen(
+                    ["pw-play", *target, "--volume", str(o.get("gain", 100) / 100.0 * gain), fp],
                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
+                ))
             self.current_playing_path = fp
             self.lbl_status.setText(f"Playing: {Path(fp).name}")
         except FileNotFoundError:
             self.lbl_status.setText("Error: pw-play not found. Install pipewire.")
-        except Exception as e:
+        except OSError as e:
+            self.lbl_status.setText(f"Error: {e}")
+
+    def queue_file(self, fp):
+        if not self.enabled_outputs():
+            self.lbl_status.setText("No output enabled!")
+            return
+        try:
+            self.engine.set_outputs(self.outputs)
+            self.engine.enqueue(fp)
+            self.lbl_status.setText(f"Queued: {Path(fp).name}")
+        except OSError as e:
             self.lbl_status.setText(f"Error: {e}")
 
     def stop_sound(self):
-        for proc in [self.proc_mic, self.proc_local]:
-            if proc:
-                try:
-                    proc.send_signal(signal.SIGINT)
-                    proc.wait(timeout=0.1)
-                except:
-                    try: proc.kill()
-                    except: pass
-        self.proc_mic = self.proc_local = None
+        import subprocess
+        if self.engine:
+            self.engine.stop()
+        for proc in self.procs:
+            try:
+                proc.send_signal(signal.SIGINT)
+                proc.wait(timeout=0.1)
+            except (OSError, subprocess.TimeoutExpired):
+                try: proc.kill()
+                except OSError: pass
+        self.procs = []
         self.current_playing_path = None
         self.lbl_status.setText("Stopped")
 
-    def change_target(self):
-        dialog = DeviceSelectDialog(self, self.target)
+    def edit_outputs(self):
+        dialog = OutputsDialog(self, self.outputs, self.devices)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            device = dialog.get_selected_device()
-            if device:
-                self.target = device
-                self.update_target_button()
-                self.save_config()
+            self.outputs = dialog.outputs
+            if self.engine:
+                self.engine.set_outputs(self.outputs)
+            self.update_outputs()
+            self.rebuild_output_strip()
+            self.save_config()
 
     def table_context_menu(self, pos):
-        row = self.table.rowAt(pos.y())
+        view_row = self.table.rowAt(pos.y())
+        row = self.model.source(view_row)
         if row == -1: return
-        self.table.selectRow(row)
+        self.table.selectRow(view_row)
         menu = QMenu()
         menu.setStyleSheet("QMenu { background: #2d2d2d; color: white; border: 1px solid #3d3d3d; } QMenu::item:selected { background: #3daee9; }")
         act_hk = menu.addAction("Set Hotkey")
         act_ren = menu.addAction("Rename")
+        act_from = menu.addAction("Play From...")
+        act_next = menu.addAction("Play Next")
+        act_loop = menu.addAction("Loop")
+        for act in (act_from, act_next, act_loop):
+            act.setEnabled(bool(self.engine))
+        moves = {}
+        if len(self.categories) > 1:
+            move_menu = menu.addMenu("Move To")
+            for c in self.categories:
+                if c["id"] != self.category:
+                    moves[move_menu.addAction(c["name"])] = c["id"]
         menu.addSeparator()
         act_del = menu.addAction("Delete")
         res = menu.exec(self.table.viewport().mapToGlobal(pos))
         if res == act_hk: self.set_hotkey(row)
         elif res == act_ren: self.rename_sound(row)
+        elif res == act_from: self.play_from(row)
+        elif res == act_next: self.queue_file(self.sounds[row]["file"])
+        elif res == act_loop: self.play_file(self.sounds[row]["file"], loop=True)
+        elif res in moves: self.move_to_category(row, moves[res])
         elif res == act_del: self.remove_selected()
 
     def set_hotkey(self, row):
         curr = self.sounds[row].get("hotkey", "")
-        hk, ok = QInputDialog.getText(self, "Set Hotkey", "Key combo (e.g. F1, A, 1):", text=curr)
+        hk, ok = QInputDialog.getText(self, "Set Hotkey", "Key combo (e.g. F1, A, Ctrl+Shift+A, Num5, !).\n"
+                                       "Symbols are matched as typed; modifiers must match exactly:", text=curr)
         if ok:
+            if hk.strip() and not self.ghk.parse(hk):
+                self.lbl_status.setText(f"Unknown hotkey: {hk}")
+                return
             self.sounds[row]["hotkey"] = hk.upper()
-            self.save_config()
-            self.refresh_table()
+            self.save_config(("set", row, dict(self.sounds[row])))
+            self.model.row_changed(row)
+            self.sounds_changed(self.sounds[row])
+            self.setup_global_hotkeys()
+
+    def play_from(self, row):
+        fp = self.sounds[row]["file"]
+        try:
+            playing = self.engine.is_playing(fp)
+            at = self.engine.position(fp) if playing else self.engine.stopped_at.get(fp)
+        except OSError as e:
+            self.lbl_status.setText(f"Error: {e}")
+            return
+        curr = f"{int(at // 60)}:{at % 60:04.1f}" if at else "0:00"
+        text, ok = QInputDialog.getText(self, "Play From", "Position (m:ss or seconds):", text=curr)
+        if not ok:
+            return
+        try:
+            mins, _, secs = text.strip().rpartition(":")
+            start = float(mins or 0) * 60 + float(secs)
+        except ValueError:
+            self.lbl_status.setText(f"Invalid position: {text}")
+            return
+        if not playing:
+            self.play_file(fp, start)
+            return
+        try:
+            self.engine.seek(fp, start)
+            self.lbl_status.setText(f"Seek: {Path(fp).name} to {text.strip()}")
+        except OSError as e:
+            self.lbl_status.setText(f"Error: {e}")
 
     def rename_sound(self, row):
         curr = self.sounds[row]["name"]
         name, ok = QInputDialog.getText(self, "Rename", "Name:", text=curr)
         if ok and name:
             self.sounds[row]["name"] = name
-            self.save_config()
-            self.refresh_table()
+            self.save_config(("set", row, dict(self.sounds[row])))
+            self.model.row_changed(row)
+            self.sounds_changed(self.sounds[row])
 
     def remove_selected(self):
-        row = self.table.currentRow()
+        row = self.current_row()
         if row >= 0:
-            self.sounds.pop(row)
-            self.save_config()
-            self.refresh_table()
+            entry = self.model.remove(row)
+            self.search_index.remove(entry, row)
+            self.save_config(("del", row))
+            self.update_count()
+            if entry.get("hotkey"):
+                self.setup_global_hotkeys()
+
+    def hotkey_index(self):
+        return self.hotkeys_other + Library.index(self.sounds, self.category)
 
     def setup_global_hotkeys(self):
-        self.ghk.clear()
-        for s in self.sounds:
-            if s.get("hotkey") and s.get("file"):
-                self.ghk.register(s["hotkey"], s["file"])
+        bound = [(e["hotkey"], e["file"]) for e in self.hotkey_index()]
+        self.ghk.set_hotkeys(bound)
+        if self.engine:
+            self.engine.cache.pin([fp for _, fp in bound])
+
+    def on_hotkey(self, fp):
+        if not (self.engine and self.enabled_outputs()):
+            self.hk_sig.triggered.emit(fp)
+            return
+        try:
+            started = self.engine.toggle(fp)
+        except OSError as e:
+            self.hk_sig.status.emit(f"Error: {e}")
+            return
+        self.hk_sig.status.emit(f"{'Playing' if started else 'Stopped'}: {Path(fp).name}")
+
+    def lbl_status_set(self, text):
+        self.lbl_status.setText(text)
 
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls(): e.accept()
     
     def dropEvent(self, e):
-        exts = {".mp3", ".wav", ".ogg", ".flac", ".m4a", ".opus", ".aac"}
-        for u in e.mimeData().urls():
-            fp = u.toLocalFile()
-            if Path(fp).suffix.lower() in exts:
-                self.sounds.append({"file": fp, "name": Path(fp).stem, "hotkey": ""})
-        self.save_config()
-        self.refresh_table()
+        paths = [u.toLocalFile() for u in e.mimeData().urls() if u.isLocalFile()]
+        if paths:
+            self.import_paths(paths)
 
     def load_config(self):
-        if CONFIG_FILE.exists():
-            try:
-                with open(CONFIG_FILE) as f:
-                    d = json.load(f)
-                    self.sounds = d.get("sounds", [])
-                    self.target = d.get("target", "")
-                    self.vol_local = d.get("vol_local", 50)
-                    self.vol_mic = d.get("vol_mic", 100)
-                    self.update_target_button()
-                    self.slider_mic.setValue(self.vol_mic)
-                    self.lbl_mic_val.setText(f"{self.vol_mic}%")
-                    self.slider_local.setValue(self.vol_local)
-                    self.lbl_local_val.setText(f"{self.vol_local}%")
-            except: pass
-
-    def save_config(self):
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"sounds": self.sounds, "target": self.target, "vol_mic": self.vol_mic, "vol_local": self.vol_local}, f, indent=2)
+        d, error = self.store.load()
+        self.library = Library(mode=d.get("library", "json"))
+        self.library.migrate(d)
+        self.library_format = self.library.mode
+        migrate_outputs(d)
+        self.config_extra = {k: v for k, v in d.items() if k != "sounds"}
+        self.categories = d["categories"]
+        cid = d.get("category")
+        self.category = cid if self.find_category(cid) else self.categories[0]["id"]
+        self.hotkeys_other = [e for e in d.get("hotkeys", []) if e.get("category") != self.category]
+        self.sounds, shard_error = self.library.load(self.category)
+        self.pending_ops = None if self.library.store(self.category).needs_compact else []
+        error = error or shard_error
+        if error:
+            QTimer.singleShot(0, lambda: self.lbl_status.setText(error))
+        self.refresh_sidebar()
+        self.outputs = [dict(o) for o in d["outputs"] if o.get("name")]
+        self.playback_mode = d.get("playback_mode", "engine")
+        self.cache_mb = d.get("cache_mb", 256)
+        self.disk_cache = d.get("disk_cache", True)
+        self.max_voices = d.get("max_voices", 16)
+        self.voice_steal = d.get("voice_steal", "oldest")
+        self.import_warm_cache = d.get("import_warm_cache", False)
+        self.normalize = d.get("normalize", True)
+        self.target_lufs = d.get("target_lufs", -16.0)
+        self.stream_seconds = d.get("stream_seconds", 60)
+        self.audio_worker = d.get("audio_worker", True)
+        self.show_stats = d.get("stats_panel", False)
+        self.stats_act.setChecked(self.show_stats)
+        self.update_outputs()
+        self.rebuild_output_strip()
+
+    def settings(self):
+        return {**self.config_extra, "outputs": self.outputs,
+                "playback_mode": self.playback_mode, "cache_mb": self.cache_mb, "disk_cache": self.disk_cache,
+                "max_voices": self.max_voices, "voice_steal": self.voice_steal, "library": self.library_format,
+                "import_warm_cache": self.import_warm_cache, "normalize": self.normalize, "target_lufs": self.target_lufs,
+                "stream_seconds": self.stream_seconds, "audio_worker": self.audio_worker, "stats_panel": self.show_stats,
+                "categories": self.categories,
+                "category": self.category, "hotkeys": self.hotkey_index()}
+
+    def save_config(self, op=None, full=False):
+        if full or self.pending_ops is None:
+            self.pending_ops = None
+        elif op is not None:
+            self.pending_ops.append(op)
+        self.save_timer.start()
+
+    def flush_config(self):
+        self.save_timer.stop()
+        category = self.find_category(self.category)
+        if self.pending_ops is None or (self.pending_ops and not self.library.store(self.category).log_mode):
+            self.library.save(category, [dict(s) for s in self.sounds])
+        elif self.pending_ops:
+            self.library.save(category, ops=self.pending_ops)
+        self.store.save(self.settings())
+        self.pending_ops = []
+        if self.attached:
+            self.library.flush()
+            self.store.flush()
+            self.engine.reload()
+
+    def find_category(self, cid):
+        return next((c for c in self.categories if c["id"] == cid), None)
+
+    def refresh_sidebar(self):
+        icon = self.style().standardIcon(QStyle.StandardPixmap.SP_DirHomeIcon)
+        self.sidebar.blockSignals(True)
+        self.sidebar.clear()
+        for c in self.categories:
+            item = QListWidgetItem(c["name"])
+            item.setIcon(icon)
+            item.setData(Qt.ItemDataRole.UserRole, c["id"])
+            self.sidebar.addItem(item)
+            if c["id"] == self.category:
+                self.sidebar.setCurrentItem(item)
+        self.sidebar.blockSignals(False)
+
+    def on_category_selected(self, item, _previous=None):
+        if item is not None:
+            self.switch_category(item.data(Qt.ItemDataRole.UserRole))
+
+    def switch_category(self, cid):
+        if cid == self.category or not self.find_category(cid):
+            return
+        if self.loudness_job:
+            self.loudness_job.cancel()
+        self.flush_config()
+        self.hotkeys_other = [e for e in self.hotkey_index() if e["category"] != cid]
+        self.library.unload(self.category)
+        self.category = cid
+        self.sounds, error = self.library.load(cid)
+        self.pending_ops = None if self.library.store(cid).needs_compact else []
+        self.refresh_sidebar()
+        self.refresh_table()
+        if error:
+            self.lbl_status.setText(error)
+        self.sync_engine()
+        if self.started:
+            self.analyze_loudness()
+            self.build_index()
+        self.save_config()
+
+    def sidebar_context_menu(self, pos):
+        item = self.sidebar.itemAt(pos)
+        cid = item.data(Qt.ItemDataRole.UserRole) if item else None
+        menu = QMenu()
+        menu.setStyleSheet("QMenu { background: #2d2d2d; color: white; border: 1px solid #3d3d3d; } QMenu::item:selected { background: #3daee9; }")
+        act_new = menu.addAction("New Category...")
+        act_ren = menu.addAction("Rename...") if cid else None
+        act_del = menu.addAction("Delete") if cid and cid != Library.DEFAULT["id"] else None
+        res = menu.exec(self.sidebar.viewport().mapToGlobal(pos))
+        if res is None: return
+        if res == act_new: self.new_category()
+        elif res == act_ren: self.rename_category(cid)
+        elif res == act_del: self.delete_category(cid)
+
+    def new_category(self):
+        name, ok = QInputDialog.getText(self, "New Category", "Name:")
+        if not (ok and name.strip()):
+            return
+        category = {"id": self.library.new_id(name, self.categories), "name": name.strip()}
+        self.categories.append(category)
+        self.library.save(category, [])
+        self.refresh_sidebar()
+        self.switch_category(category["id"])
+
+    def rename_category(self, cid):
+        category = self.find_category(cid)
+        name, ok = QInputDialog.getText(self, "Rename Category", "Name:", text=category["name"])
+        if ok and name.strip():
+            category["name"] = name.strip()
+            self.refresh_sidebar()
+            self.save_config()
+
+    def delete_category(self, cid):
+        category = self.find_category(cid)
+        answer = QMessageBox.question(self, "Delete Category", f"Delete \"{category['name']}\" and all of its sounds?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        if cid == self.category:
+            self.switch_category(Library.DEFAULT["id"])
+        self.categories.remove(category)
+        self.hotkeys_other = [e for e in self.hotkeys_other if e["category"] != cid]
+        self.library.remove(cid)
+        self.refresh_sidebar()
+        self.setup_global_hotkeys()
+        self.save_config()
+
+    def move_to_category(self, row, cid):
+        category = self.find_category(cid)
+        entry = self.model.remove(row)
+        self.search_index.remove(entry, row)
+        self.save_config(("del", row))
+        self.library.append(category, [entry])
+        if entry.get("hotkey"):
+            self.hotkeys_other += Library.index([entry], cid)
+            self.setup_global_hotkeys()
+        self.update_count()
+        self.lbl_status.setText(f"Moved {entry.get('name', '')} to {category['name']}")
 
     def closeEvent(self, e):
-        self.stop_sound()
+        self.cancel_import()
+        if self.loudness_job:
+            self.loudness_job.cancel()
+        if self.peak_loader:
+            self.peak_loader.stop()
+        if self.save_timer.isActive():
+            self.flush_config()
+        self.library.flush()
+        self.store.flush()
+        if not self.attached:
+            self.stop_sound()
         self.ghk.stop()
+        self.devices.stop()
+        if self.engine:
+            self.engine.shutdown()
         e.accept()
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+class RemoteCache:
+    def __init__(self, client):
+        self.client = client
+
+    def stats(self):
+        return self.client.call("stats")["cache"]
+
+    def pin(self, paths):
+        pass
+
+    def warm(self, paths):
+        pass
+
+
+class RemoteEngine:
+    def __init__(self, client):
+        self.client = client
+        self.cache = RemoteCache(client)
+        self.outputs = None
+
+    def set_outputs(self, outputs):
+        if outputs != self.outputs:
+            reply = self.client.call("outputs", json.dumps(outputs))
+            if not reply["ok"]:
+                raise OSError(reply["error"])
+            self.outputs = [dict(o) for o in outputs]
+
+    def set_gain(self, name, gain):
+        output = find_output(self.outputs or [], name)
+        if output is None or output["gain"] != round(gain * 100):
+            self.client.call("volume", name, round(gain * 100))
+            if output:
+                output["gain"] = round(gain * 100)
+
+    def set_clip_gains(self, gains):
+        pass
+
+    def set_durations(self, durations):
+        pass
+
+    def set_hashes(self, hashes):
+        pass
+
+    def set_devices(self, names):
+        return []
+
+    @property
+    def stopped_at(self):
+        return self.client.call("status").get("stopped_at", {})
+
+    def play(self, fp, start=0.0, loop=False):
+        if loop:
+            reply = self.client.call("loop", fp)
+        else:
+            reply = self.client.call("play", fp, start) if start else self.client.call("play", fp)
+        if not reply["ok"]:
+            raise OSError(reply["error"])
+
+    def enqueue(self, fp):
+        reply = self.client.call("queue", fp)
+        if not reply["ok"]:
+            raise OSError(reply["error"])
+
+    def position(self, fp):
+        return self.client.call("position", fp).get("position")
+
+    def seek(self, fp, seconds):
+        reply = self.client.call("seek", fp, seconds)
+        if not reply["ok"]:
+            raise OSError(reply["error"])
+        return True
+
+    def toggle(self, fp):
+        reply = self.client.call("toggle", fp)
+        if not reply["ok"]:
+            raise OSError(reply["error"])
+        return reply["playing"]
+
+    def stop(self, fp=None):
+        self.client.call("stop", fp) if fp else self.client.call("stop")
+
+    def active(self):
+        return self.client.call("status")["playing"]
+
+    def is_playing(self, fp):
+        return fp in self.active()
+
+    def stats_snapshot(self):
+        return self.client.call("stats")["playback"]
+
+    def reload(self):
+        self.client.call("reload")
+
+    def shutdown(self):
+        self.client.close()
+
+
+def audio_worker_main(settings, segments, tag, commands, events):
+    import queue
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parent = os.getppid()
+    shared = SharedBuffers(tag, segments, events.put)
+    engine = PlaybackEngine.from_settings(settings, shared)
+    events.put(("ready", os.getpid()))
+    pushed = 0.0
+    try:
+        while True:
+            if time.monotonic() - pushed >= 1.0:
+                events.put(("stats", engine.cache.stats(), engine.stats_snapshot()))
+                pushed = time.monotonic()
+            try:
+                msg = commands.get(timeout=1.0)
+            except queue.Empty:
+                if os.getppid() != parent:
+                    break
+                continue
+            if msg is None:
+                break
+            seq, name, args = msg
+            try:
+                if name == "active":
+                    result = [p.path for p in engine.active()]
+                elif name == "stopped_at":
+                    result = dict(engine.stopped_at)
+                elif name.startswith("_") or name.startswith("cache._"):
+                    raise ValueError(f"unknown call: {name}")
+                else:
+                    owner, _, attr = name.rpartition(".")
+                    result = getattr(engine.cache if owner == "cache" else engine, attr)(*args)
+                    if not isinstance(result, (bool, int, float, str, dict, list)):
+                        result = None
+                reply = ("reply", seq, True, result)
+            except OSError as e:
+                reply = ("reply", seq, False, str(e))
+            except (KeyError, TypeError, ValueError) as e:
+                reply = ("reply", seq, False, str(e.args[0]) if e.args else str(e))
+            if seq:
+                events.put(reply)
+    finally:
+        import gc
+        engine.shutdown()
+        engine = None
+        gc.collect()
+        shared.close()
+
+
+class WorkerCache:
+    def __init__(self, worker):
+        self.worker = worker
+
+    def stats(self):
+        return self.worker.snapshot()[0]
+
+    def pin(self, paths):
+        self.worker.send("cache.pin", list(paths), keep=True)
+
+    def warm(self, paths):
+        self.worker.send("cache.warm", list(paths))
+
+
+class AudioWorker:
+    def __init__(self, settings, timeout=2.0, max_crashes=5):
+        import multiprocessing
+        self.ctx = multiprocessing.get_context("spawn")
+        self.settings = settings
+        self.timeout = timeout
+        self.cache = WorkerCache(self)
+        self.tag = f"linuxpad-{os.getpid()}"
+        self.segments = {}
+        self.state = {}
+        self.outputs = None
+        self.pending = {}
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.crashes = deque(maxlen=max_crashes)
+        self.restarts = 0
+        self.failed = None
+        self.closing = False
+        self.proc = None
+        self.commands = self.events = None
+        self.latest = None
+        self._spawn()
+        self.thread = threading.Thread(target=self._supervise, daemon=True)
+        self.thread.start()
+
+    def _spawn(self):
+        import queue
+        self.ready.clear()
+        if self.events is not None:
+            try:
+                while True:
+                    self._dispatch(self.events.get_nowait())
+            except queue.Empty:
+                pass
+            self._close_queues()
+        self.commands, self.events = self.ctx.Queue(), self.ctx.Queue()
+        self.proc = self.ctx.Process(target=audio_worker_main, name="linuxpad-audio", daemon=True,
+                                     args=(self.settings, dict(self.segments), self.tag, self.commands, self.events))
+        self.proc.start()
+        for name, args in self.state.items():
+            self.commands.put((0, name, args))
+
+    def _supervise(self):
+        import queue
+        while not self.closing and not self.failed:
+            proc = self.proc
+            try:
+                msg = self.events.get(timeout=0.25)
+            except queue.Empty:
+                if proc.exitcode is not None and not self.closing:
+                    self._restart(proc.exitcode)
+                continue
+            self._dispatch(msg)
+
+    def _dispatch(self, msg):
+        if msg[0] == "reply":
+            slot = self.pending.pop(msg[1], None)
+            if slot:
+                slot[1:] = msg[2:]
+                slot[0].set()
+        elif msg[0] == "segment":
+            if msg[2]:
+                self.segments[msg[1]] = msg[2:]
+            else:
+                self.segments.pop(msg[1], None)
+        elif msg[0] == "stats":
+            self.latest = msg[1:]
+        elif msg[0] == "ready":
+            self.ready.set()
+
+    def _close_queues(self):
+        if self.proc.exitcode != 0:
+            self.commands.cancel_join_thread()
+        for q in (self.commands, self.events):
+            q.close()
+            q.join_thread()
+
+    def snapshot(self):
+        if self.failed:
+            raise OSError(self.failed)
+        if self.latest is None:
+            raise OSError("starting")
+        return self.latest
+
+    def _restart(self, code):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for slot in pending.values():
+            slot[1:] = False, f"audio worker exited ({code})"
+            slot[0].set()
+        now = time.monotonic()
+        self.crashes.append(now)
+        if len(self.crashes) == self.crashes.maxlen and now - self.crashes[0] < 30:
+            self.failed = f"audio worker keeps crashing (exit {code})"
+            print(f"linuxpad: {self.failed}, giving up", file=sys.stderr)
+            return
+        print(f"linuxpad: audio worker exited ({code}), restarting", file=sys.stderr)
+        self.restarts += 1
+        self._spawn()
+
+    def send(self, name, *args, keep=False):
+        if keep:
+            self.state[name] = args
+        self.commands.put((0, name, args))
+
+    def call(self, name, *args):
+        if self.failed:
+            raise OSError(self.failed)
+        slot = [threading.Event(), False, "audio worker not responding"]
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            self.pending[seq] = slot
+        proc = self.proc
+        self.commands.put((seq, name, args))
+        if not slot[0].wait(self.timeout if self.ready.is_set() else self.timeout + 10):
+            self.pending.pop(seq, None)
+            if proc.exitcode is None:
+                proc.kill()
+            raise OSError(slot[2])
+        if not slot[1]:
+            raise OSError(slot[2])
+        return slot[2]
+
+    def set_outputs(self, outputs):
+        if outputs != self.outputs:
+            self.outputs = [dict(o) for o in outputs]
+            self.send("set_outputs", self.outputs, keep=True)
+
+    def set_gain(self, name, gain):
+        output = find_output(self.outputs or [], name)
+        if output:
+            output["gain"] = round(gain * 100)
+        self.send("set_gain", name, gain)
+
+    def set_clip_gains(self, gains):
+        self.send("set_clip_gains", gains, keep=True)
+
+    def set_durations(self, durations):
+        self.send("set_durations", durations, keep=True)
+
+    def set_hashes(self, hashes):
+        self.send("set_hashes", hashes, keep=True)
+
+    def set_quantize(self, bpm, steps=4):
+        self.send("set_quantize", bpm, steps, keep=True)
+
+    def set_devices(self, names):
+        self.state["set_devices"] = (list(names),)
+        return self.call("set_devices", list(names))
+
+    def export_stats(self, fmt, path=None, interval=10):
+        self.send("export_stats", fmt, path, interval, keep=True)
+
+    @property
+    def stopped_at(self):
+        return self.call("stopped_at")
+
+    def play(self, fp, start=0.0, at=None, loop=False):
+        self.call("play", fp, start, at, loop)
+
+    def sequence(self, paths, at=None, loop=False):
+        self.call("sequence", list(paths), at, loop)
+
+    def enqueue(self, fp):
+        self.call("enqueue", fp)
+
+    def position(self, fp):
+        return self.call("position", fp)
+
+    def seek(self, fp, seconds):
+        return self.call("seek", fp, seconds)
+
+    def toggle(self, fp):
+        return self.call("toggle", fp)
+
+    def stop(self, fp=None):
+        self.send("stop", fp)
+
+    def active(self):
+        return self.call("active")
+
+    def is_playing(self, fp):
+        return fp in self.active()
+
+    def stats_snapshot(self):
+        return {**self.snapshot()[1], "worker_restarts": self.restarts}
+
+    def shutdown(self):
+        import queue
+        self.closing = True
+        self.commands.put(None)
+        self.proc.join(2.0)
+        if self.proc.exitcode is None:
+            self.proc.kill()
+            self.proc.join()
+        self.thread.join()
+        try:
+            while True:
+                self._dispatch(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        if self.proc.exitcode:
+            for name, _ in self.segments.values():
+                SharedBuffers.unlink(name)
+        self._close_queues()
+
+
+class SoundpadDaemon:
+    def __init__(self, path=None):
+        self.path = Path(path or SOCKET_PATH)
+        self.store = ConfigStore()
+        self.engine = None
+        self.ghk = GlobalHotkeyListener(self.on_hotkey)
+        self.devices = DeviceMonitor()
+        self.devices.subscribe(self.on_devices)
+        self.missing = []
+        self.running = False
+        self.library = None
+        self.reload()
+
+    def reload(self):
+        d, error = self.store.load()
+        if error:
+            print(f"linuxpad: {error}", file=sys.stderr)
+        if self.library is None:
+            self.library = Library()
+        self.library.mode = d.get("library", "json")
+        if self.library.migrate(d) | migrate_outputs(d):
+            self.store.save(d)
+            self.store.flush()
+        self.sounds = self.library.load_all(d["categories"])
+        self.search_index = SearchIndex(self.sounds)
+        self.outputs = self.parse_outputs(d["outputs"])
+        if self.engine is None:
+            self.engine = PlaybackEngine.from_settings(d)
+        else:
+            self.engine.export_stats(d.get("stats_export", ""), d.get("stats_file"), d.get("stats_interval", 10))
+            self.engine.set_quantize(d.get("quantize_bpm", 0), d.get("quantize_steps", 4))
+        self.engine.set_clip_gains(clip_gains(self.sounds, d.get("target_lufs", -16.0)) if d.get("normalize", True) else {})
+        self.engine.set_durations({s["file"]: s["duration"] for s in self.sounds if s.get("file") and "duration" in s})
+        self.engine.set_hashes(file_hashes(self.sounds))
+        self.engine.set_outputs(self.outputs)
+        bound = [(e["hotkey"], e["file"]) for e in d.get("hotkeys", []) if e.get("hotkey") and e.get("file")]
+        self.ghk.set_hotkeys(bound)
+        self.engine.cache.pin([fp for _, fp in bound])
+
+    def on_hotkey(self, fp):
+        if self.enabled():
+            self.engine.toggle(fp)
+
+    def on_devices(self, devices):
+        missing = self.engine.set_devices([d["name"] for d in devices])
+        for name in missing:
+            if name not in self.missing:
+                print(f"linuxpad: output {name} disconnected, waiting for its device", file=sys.stderr)
+        for name in self.missing:
+            if name not in missing:
+                print(f"linuxpad: output {name} reconnected", file=sys.stderr)
+        self.missing = missing
+
+    @staticmethod
+    def parse_outputs(outputs):
+        if not isinstance(outputs, list):
+            raise ValueError("outputs takes a JSON list")
+        parsed = []
+        for o in outputs:
+            if not isinstance(o, dict) or not isinstance(o.get("name"), str) or not o["name"].strip():
+                raise ValueError("every output needs a name")
+            parsed.append({"name": o["name"].strip(), "target": str(o.get("target") or ""),
+                           "gain": max(0, min(100, int(o.get("gain", 100)))), "enabled": bool(o.get("enabled", True))})
+        return parsed
+
+    def enabled(self):
+        return any(o["enabled"] for o in self.outputs)
+
+    def resolve(self, ref):
+        if ref.isdigit() and 0 < int(ref) <= len(self.sounds):
+            return self.sounds[int(ref) - 1]["file"]
+        low = ref.lower()
+        for s in self.sounds:
+            if s.get("file") == ref or s.get("name", "").lower() == low:
+                return s["file"]
+        if os.path.isfile(ref):
+            return ref
+        raise KeyError(f"no such sound: {ref}")
+
+    def describe(self, i):
+        s = self.sounds[i]
+        return {"index": i + 1, "name": s.get("name", ""), "hotkey": s.get("hotkey", ""), "file": s.get("file", ""),
+                "category": s.get("category", "")}
+
+    def resolve_at(self, args):
+        if len(args) > 1:
+            try:
+                seconds = float(args[-1])
+                return self.resolve(" ".join(args[:-1])), seconds
+            except (KeyError, ValueError):
+                pass
+        return self.resolve(" ".join(args)), None
+
+    @staticmethod
+    def parse(line):
+        line = line.strip()
+        if line.startswith("["):
+            words = json.loads(line)
+            if not isinstance(words, list) or not words:
+                raise ValueError("request must be a non-empty JSON list")
+            return str(words[0]), [str(w) for w in words[1:]]
+        cmd, _, arg = line.partition(" ")
+        return cmd, [arg.strip()] if cmd == "outputs" else arg.split()
+
+    def handle(self, line):
+        try:
+            cmd, args = self.parse(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"malformed request: {e}"}
+        arg = " ".join(args)
+        try:
+            if cmd == "ping":
+                return {"ok": True}
+            if cmd in ("play", "toggle"):
+                fp, start = self.resolve_at(args) if cmd == "play" else (self.resolve(arg), None)
+                if not self.enabled():
+                    return {"ok": False, "error": "no output enabled"}
+                if cmd == "play":
+                    self.engine.play(fp, start or 0.0)
+                    return {"ok": True, "playing": True, "file": fp}
+                return {"ok": True, "playing": self.engine.toggle(fp), "file": fp}
+            if cmd in ("loop", "queue", "sequence"):
+                refs = (arg.split(";") if ";" in arg else args) if cmd == "sequence" else [arg]
+                paths = [self.resolve(ref.strip()) for ref in refs if ref.strip()]
+                if not paths:
+                    return {"ok": False, "error": "sequence takes one or more sounds"}
+                if not self.enabled():
+                    return {"ok": False, "error": "no output enabled"}
+                if cmd == "loop":
+                    self.engine.play(paths[0], loop=True)
+                elif cmd == "queue":
+                    self.engine.enqueue(paths[0])
+                else:
+                    self.engine.sequence(paths)
+                return {"ok": True, "playing": True, "files": paths}
+            if cmd == "quantize":
+                bpm, steps = (args + ["", ""])[:2]
+                self.engine.set_quantize(float(bpm or 0), int(steps or 4))
+                return {"ok": True, "bpm": float(bpm or 0), "steps": int(steps or 4)}
+            if cmd == "stop":
+                self.engine.stop(self.resolve(arg) if arg else None)
+                return {"ok": True}
+            if cmd == "seek":
+                fp, seconds = self.resolve_at(args)
+                if seconds is None:
+                    return {"ok": False, "error": "seek takes a sound and a position in seconds"}
+                if not self.engine.seek(fp, seconds):
+                    return {"ok": False, "error": f"not playing: {fp}"}
+                return {"ok": True, "file": fp, "position": seconds}
+            if cmd == "position":
+                fp = self.resolve(arg)
+                return {"ok": True, "file": fp, "position": self.engine.position(fp)}
+            if cmd == "volume":
+                name, value = " ".join(args[:-1]), args[-1] if args else ""
+                output = find_output(self.outputs, name)
+                if output is None:
+                    return {"ok": False, "error": "volume takes an output name and 0-100"}
+                output["gain"] = max(0, min(100, int(value)))
+                self.engine.set_gain(output["name"], output["gain"] / 100.0)
+                return {"ok": True, output["name"]: output["gain"]}
+            if cmd in ("enable", "disable"):
+                output = find_output(self.outputs, arg)
+                if output is None:
+                    return {"ok": False, "error": f"no such output: {arg}"}
+                output["enabled"] = cmd == "enable"
+                self.engine.set_outputs(self.outputs)
+                return {"ok": True, "outputs": self.outputs}
+            if cmd == "outputs":
+                if arg:
+                    self.outputs = self.parse_outputs(json.loads(arg))
+                    self.engine.set_outputs(self.outputs)
+                return {"ok": True, "outputs": self.outputs}
+            if cmd == "target":
+                output = find_output(self.outputs, "Mic")
+                if output is None:
+                    output = {"name": "Mic", "target": "", "gain": 100, "enabled": True}
+                    self.outputs.insert(0, output)
+                output["target"], output["enabled"] = arg, bool(arg)
+                self.engine.set_outputs(self.outputs)
+                return {"ok": True, "target": arg}
+            if cmd == "list":
+                return {"ok": True, "sounds": [self.describe(i) for i in range(len(self.sounds))]}
+            if cmd == "search":
+                rows = self.search_index.search(arg)
+                rows = range(len(self.sounds)) if rows is None else rows
+                top = self.search_index.top(arg)
+                if top is not None:
+                    rows = [top] + [r for r in rows if r != top]
+                return {"ok": True, "sounds": [self.describe(i) for i in list(rows)[:20]]}
+            if cmd == "playmatch":
+                row = self.search_index.top(arg)
+                if row is None:
+                    return {"ok": False, "error": f"no match: {arg}"}
+                if not self.enabled():
+                    return {"ok": False, "error": "no output enabled"}
+                fp = self.sounds[row]["file"]
+                self.engine.play(fp)
+                return {"ok": True, "playing": True, "file": fp}
+            if cmd == "status":
+                return {"ok": True, "playing": [p.path for p in self.engine.active()], "outputs": self.outputs,
+                        "offline": self.missing, "stopped_at": self.engine.stopped_at}
+            if cmd == "stats":
+                return {"ok": True, "cache": self.engine.cache.stats(), "playback": self.engine.stats_snapshot()}
+            if cmd == "reload":
+                self.reload()
+                return {"ok": True, "sounds": len(self.sounds)}
+            if cmd == "quit":
+                self.running = False
+                return {"ok": True}
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            return {"ok": False, "error": str(e.args[0]) if e.args else str(e)}
+        return {"ok": False, "error": f"unknown command: {cmd}"}
+
+    def serve(self):
+        import selectors
+        if ControlClient.connect(self.path):
+            print(f"linuxpad: daemon already running on {self.path}", file=sys.stderr)
+            return 1
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        server.listen(8)
+        server.setblocking(False)
+        sel = selectors.DefaultSelector()
+        sel.register(server, selectors.EVENT_READ)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: setattr(self, "running", False))
+        self.ghk.start()
+        self.devices.start()
+        self.running = True
+        buffers = {}
+        try:
+            while self.running:
+                for key, _ in sel.select(timeout=0.5):
+                    if key.fileobj is server:
+                        conn, _ = server.accept()
+                        conn.setblocking(False)
+                        sel.register(conn, selectors.EVENT_READ)
+                        buffers[conn] = b""
+                        continue
+                    conn = key.fileobj
+                    try:
+                        data = conn.recv(65536)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        sel.unregister(conn)
+                        buffers.pop(conn, None)
+                        conn.close()
+                        continue
+                    buf = buffers[conn] + data
+                    *lines, buffers[conn] = buf.split(b"\n")
+                    out = b"".join(json.dumps(self.handle(l.decode(errors="replace"))).encode() + b"\n"
+                                   for l in lines if l.strip())
+                    if out:
+                        conn.setblocking(True)
+                        conn.sendall(out)
+                        conn.setblocking(False)
+        finally:
+            self.ghk.stop()
+            self.devices.stop()
+            self.engine.shutdown()
+            sel.close()
+            server.close()
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="linuxpad")
+    parser.add_argument("--daemon", action="store_true", help="run headless and accept commands on the control socket")
+    parser.add_argument("--ctl", nargs=argparse.REMAINDER, metavar="COMMAND", help="send a command to a running daemon")
+    parser.add_argument("--profile-startup", action="store_true", help="print a per-phase startup time breakdown")
+    parser.add_argument("--prune-cache", nargs="?", type=int, const=-1, metavar="MB",
+                        help="shrink the decoded audio cache to MB (default: disk_cache_mb from config) and exit")
+    args, qt_args = parser.parse_known_args()
+    if args.ctl is not None:
+        return ctl_main(args.ctl)
+    if args.daemon:
+        if not PlaybackEngine.available():
+            print("linuxpad: --daemon needs pw-play and ffmpeg", file=sys.stderr)
+            return 1
+        return SoundpadDaemon().serve()
+    if args.prune_cache is not None:
+        cap = args.prune_cache if args.prune_cache >= 0 else ConfigStore().load()[0].get("disk_cache_mb", 2048)
+        removed, freed, total = DiskCache().prune(cap * 1024 * 1024)
+        print(f"Removed {removed} files ({freed / 1048576:.1f} MB), cache is now {total / 1048576:.1f} MB")
+        return 0
+    startup_mark("imports")
+    app = QApplication([Path(sys.argv[0]).stem] + qt_args)
     app.setStyle("Fusion")
+    startup_mark("qt init")
     w = SoundpadWindow()
+    w.profile_startup = args.profile_startup
     w.show()
-    sys.exit(app.exec())
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
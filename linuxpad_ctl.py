@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import argparse
+import socket
+import threading
+from pathlib import Path
+
+SOCKET_PATH = Path(os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/linuxpad-{os.getuid()}") / "linuxpad.sock"
+
+
+class ControlClient:
+    def __init__(self, path=None, timeout=2.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(str(path or SOCKET_PATH))
+        self.reader = self.sock.makefile("rb")
+        self.lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, path=None):
+        try:
+            return cls(path)
+        except OSError:
+            return None
+
+    def call(self, *args):
+        line = json.dumps([str(a) for a in args])
+        with self.lock:
+            self.sock.sendall(line.encode() + b"\n")
+            reply = self.reader.readline()
+        if not reply:
+            raise ConnectionError("daemon closed the connection")
+        return json.loads(reply)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def ctl_main(argv):
+    parser = argparse.ArgumentParser(prog="linuxpad-ctl", description="Control a running linuxpad --daemon",
+                                     epilog='quote sound names with spaces: linuxpad-ctl play "Airhorn 2" 1.5')
+    parser.add_argument("--socket", help=f"control socket (default: {SOCKET_PATH})")
+    parser.add_argument("command", help="ping, play, toggle, loop, queue, sequence, quantize, stop, seek, position, volume, "
+                                        "enable, disable, outputs, target, list, search, playmatch, status, stats, reload or quit")
+    parser.add_argument("args", nargs="*")
+    args = parser.parse_args(argv)
+    client = ControlClient.connect(args.socket)
+    if not client:
+        print("linuxpad-ctl: daemon is not running", file=sys.stderr)
+        return 1
+    reply = client.call(args.command, *args.args)
+    client.close()
+    if args.command in ("list", "search") and reply.get("ok"):
+        for s in reply["sounds"]:
+            print(f"{s['index']:>5}  {s['hotkey']:<12} {s['name']}")
+    elif reply.get("ok"):
+        print(json.dumps({k: v for k, v in reply.items() if k != "ok"}))
+    else:
+        print(f"linuxpad-ctl: {reply.get('error')}", file=sys.stderr)
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(ctl_main(sys.argv[1:]))
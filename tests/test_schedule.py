@@ -0,0 +1,107 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bench
+import linuxpad as lp
+
+
+@pytest.fixture(scope="module")
+def fake():
+    fake = bench.FakeBackend()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture(scope="module")
+def engine(fake):
+    lp.load_numpy()
+    engine = lp.PlaybackEngine(disk_cache=False, stream_seconds=0)
+    engine.set_output("bench", fake.TARGET)
+    yield engine
+    engine.shutdown()
+
+
+def decoded(engine, *paths):
+    samples = [engine.cache.get(fp) for fp in paths]
+    while not all(s.done for s in samples):
+        time.sleep(0.01)
+    time.sleep(0.3)
+    return paths
+
+
+def onsets(events):
+    return [(ns, f) for (_, _, prev), (ns, f, lv) in zip([(0, 0, 0)] + events, events) if lv and not prev]
+
+
+def test_sequence_has_no_gap(fake, engine):
+    a, b = decoded(engine, fake.clip("seq_a", 0.25, 1000), fake.clip("seq_b", 0.25, 2000))
+    for _ in range(5):
+        fake.drain()
+        engine.sequence([a, b])
+        events = fake.levels(0.7)
+        start = next(i for i, (_, _, lv) in enumerate(events) if lv == 2)
+        a_end = next(f for _, f, lv in events[start:] if lv != 2)
+        b_start = next(f for _, f, lv in events[start:] if lv == 4)
+        assert b_start - a_end == 0
+
+
+def test_loop_seams_are_sample_accurate(fake, engine):
+    loop, = decoded(engine, fake.clip("loop", 0.1, 3000, marker=6000))
+    fake.drain()
+    engine.play(loop, loop=True)
+    events = fake.levels(1.0)
+    engine.stop()
+    time.sleep(0.2)
+    marks = [f for _, f, lv in events if lv == 12]
+    assert len(marks) >= 5
+    assert [f2 - f1 for f1, f2 in zip(marks, marks[1:])] == [int(0.1 * lp.RATE)] * (len(marks) - 1)
+    assert not [f for _, f, lv in events if lv == 0 and f < marks[-1]]
+
+
+def test_quantized_triggers_land_on_the_grid(fake, engine):
+    hit, = decoded(engine, fake.clip("hit", 0.03, 1000))
+
+    def trigger():
+        for i in range(8):
+            engine.play(hit)
+            time.sleep(0.06 + (i * 37 % 100) / 1000)
+
+    engine.set_quantize(120, 4)
+    try:
+        fake.drain()
+        player = threading.Thread(target=trigger)
+        player.start()
+        events = fake.levels(8 * 0.11 + 0.5)
+        player.join()
+        origin = engine.outputs["bench"].grid[1]
+        frames = [f for _, f in onsets(events)]
+        assert frames
+        assert [(f - origin) % engine.step for f in frames] == [0] * len(frames)
+    finally:
+        engine.set_quantize(0)
+
+
+def test_at_spacing_is_within_one_period(fake, engine):
+    hit, = decoded(engine, fake.clip("hit", 0.03, 1000))
+    t0 = time.monotonic() + 0.1
+
+    def ahead():
+        for i in range(10):
+            time.sleep(max(0.0, t0 + i * 0.1 - 0.05 - time.monotonic()))
+            engine.play(hit, at=t0 + i * 0.1)
+
+    fake.drain()
+    player = threading.Thread(target=ahead)
+    player.start()
+    events = fake.levels(10 * 0.1 + 0.5)
+    player.join()
+    frames = [f for _, f in onsets(events)]
+    assert len(frames) == 10
+    assert max(abs(f2 - f1 - int(0.1 * lp.RATE)) for f1, f2 in zip(frames, frames[1:])) <= lp.PERIOD_FRAMES